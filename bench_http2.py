@@ -0,0 +1,97 @@
+"""
+Benchmark of concurrent transcript downloads over pooled HTTP/1.1 versus a
+single multiplexed HTTP/2 connection, against mock_granola_server.py.
+
+The mock server runs in-process on a free loopback port and answers both
+protocols. Loopback has no handshake cost, so --connect-ms delays every new
+connection to stand in for TCP + TLS setup to api.granola.ai. Each case
+fetches every transcript of the corpus once, through the same clients the
+sync uses:
+
+  requests pool   GranolaClient on a thread pool (--engine sync)
+  httpx HTTP/1.1  AsyncGranolaClient (--engine async)
+  httpx HTTP/2    AsyncGranolaClient(http2=True) (--engine async --http2)
+
+  python bench_http2.py
+  python bench_http2.py --concurrency 64 --latency-ms 120 --connect-ms 100
+
+HTTP/2 needs the h2 package (pip install 'httpx[http2]').
+"""
+import argparse
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import granola_sync
+from granola_sync import AsyncGranolaClient, GranolaClient, RateLimiter, fetch_transcript, fetch_transcript_async
+from mock_granola_server import MockGranolaServer, h2
+from mock_granola_server import parse_args as mock_args
+
+TOKEN = "bench-token"
+
+def run_requests_pool(base_url: str, doc_ids: List[str], concurrency: int):
+    with GranolaClient(TOKEN, pool_size=concurrency, limiter=RateLimiter(1e6), base_url=base_url) as client:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda doc_id: fetch_transcript(client, doc_id), doc_ids))
+
+def run_httpx(base_url: str, doc_ids: List[str], concurrency: int, http2: bool):
+    async def fetch_all():
+        async with AsyncGranolaClient(TOKEN, concurrency, limiter=RateLimiter(1e6), http2=http2,
+                                      base_url=base_url) as client:
+            gate = asyncio.Semaphore(concurrency)
+
+            async def fetch(doc_id: str):
+                async with gate:
+                    await fetch_transcript_async(client, doc_id)
+
+            await asyncio.gather(*(fetch(doc_id) for doc_id in doc_ids))
+    asyncio.run(fetch_all())
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Time transcript downloads over pooled HTTP/1.1 vs. HTTP/2.")
+    parser.add_argument("--documents", type=int, default=500, help="Corpus size (default: 500).")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight (default: 32).")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Server latency per request (default: 50).")
+    parser.add_argument("--connect-ms", type=float, default=30,
+                        help="Added cost of each new connection (default: 30).")
+    parser.add_argument("--transcript-segments", type=int, default=300,
+                        help="Maximum segments per transcript (default: 300).")
+    args = parser.parse_args(argv)
+
+    logging.getLogger(granola_sync.__name__).setLevel(logging.WARNING)
+    options = mock_args(["--documents", str(args.documents), "--latency-ms", str(args.latency_ms),
+                         "--latency-dist", "fixed", "--connect-ms", str(args.connect_ms),
+                         "--transcript-segments", str(args.transcript_segments)])
+    server = MockGranolaServer(("127.0.0.1", 0), options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    doc_ids = [doc["id"] for doc in server.corpus["docs"]]
+    print(f"{len(doc_ids)} transcript requests, {args.concurrency} in flight, "
+          f"{args.latency_ms:g} ms latency, {args.connect_ms:g} ms per new connection")
+
+    cases: List[Tuple[str, Callable[[], None]]] = [
+        ("requests pool, HTTP/1.1", lambda: run_requests_pool(base_url, doc_ids, args.concurrency)),
+        ("httpx, HTTP/1.1", lambda: run_httpx(base_url, doc_ids, args.concurrency, http2=False)),
+    ]
+    if h2 is not None:
+        cases.append(("httpx, HTTP/2", lambda: run_httpx(base_url, doc_ids, args.concurrency, http2=True)))
+    else:
+        print("h2 is not installed (pip install 'httpx[http2]'); only HTTP/1.1 is measured.")
+
+    try:
+        for name, func in cases:
+            connections = sum(server.connections.values())
+            started = time.perf_counter()
+            func()
+            seconds = time.perf_counter() - started
+            opened = sum(server.connections.values()) - connections
+            print(f"  {name:<24} {seconds:7.2f} s  {len(doc_ids) / seconds:7.1f} req/s  {opened:4d} connections")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Microbenchmark of JSON decoding on a realistic /v2/get-documents page, for
+each backend granola_sync.py can use.
+
+By default the page is 100 synthetic documents with note panels, built like
+mock_granola_server.py does; pass --page with a saved response body (e.g.
+captured with curl) to measure a real one.
+
+  python bench_json.py
+  python bench_json.py --page page.json --repeat 50
+"""
+import argparse
+import json
+import timeit
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+import requests
+
+from mock_granola_server import build_corpus
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def synthetic_page(documents: int, panel_paragraphs: int) -> bytes:
+    corpus = build_corpus(documents, seed=1, panel_paragraphs=panel_paragraphs,
+                          transcript_segments=1, missing_transcript_rate=1.0)
+    return json.dumps({"docs": corpus["docs"]}).encode('utf-8')
+
+def as_response(body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """Best-of-`repeat` seconds per call."""
+    number = 5
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Time JSON decoding of a get-documents page per backend.")
+    parser.add_argument("--page", type=Path, help="Saved get-documents response body to decode.")
+    parser.add_argument("--documents", type=int, default=100, help="Synthetic page size (default: 100).")
+    parser.add_argument("--panel-paragraphs", type=int, default=12,
+                        help="Maximum paragraphs per synthetic note panel (default: 12).")
+    parser.add_argument("--repeat", type=int, default=20, help="Timing rounds; the best is kept (default: 20).")
+    args = parser.parse_args(argv)
+
+    body = args.page.read_bytes() if args.page else synthetic_page(args.documents, args.panel_paragraphs)
+    docs = len(json.loads(body).get("docs", []))
+    print(f"Page: {docs} documents, {len(body) / 1024:.1f} KB")
+
+    cases: List[Tuple[str, Callable[[], object]]] = [
+        ("requests Response.json()", lambda: as_response(body).json()),
+        ("json.loads", lambda: json.loads(body)),
+    ]
+    if orjson is not None:
+        cases.append(("orjson.loads", lambda: orjson.loads(body)))
+    else:
+        print("orjson is not installed (pip install orjson); only the standard library is measured.")
+
+    baseline = None
+    for name, func in cases:
+        seconds = measure(func, args.repeat)
+        baseline = baseline or seconds
+        print(f"  {name:<26} {seconds * 1000:8.3f} ms/page  {len(body) / seconds / 1024 / 1024:8.1f} MB/s"
+              f"  {baseline / seconds:5.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,76 @@
 import argparse
+import asyncio
+import base64
+import codecs
+import gzip
+import hashlib
+import heapq
+import importlib.util
 import logging
 import json
 import os
 import platform
+import random
 import requests
+import socket
+import sqlite3
 import sys
+import threading
 import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from datetime import datetime
-from typing import Optional, Dict, List, Any
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Dict, List, Set, Any, AsyncIterator, Iterable, Iterator, Tuple, Union
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+from urllib3.util.request import ACCEPT_ENCODING as URLLIB3_ENCODINGS
+
+try:
+    import httpx  # optional: only needed for --engine async
+except ImportError:
+    httpx = None
+
+try:
+    import orjson  # optional: faster JSON decoding and encoding
+except ImportError:
+    orjson = None
 
 # --- Configuration ---
 DEFAULT_OUTPUT_DIR = Path("/Users/maxxyung/Claude/Granola")
-CREDS_FILE = Path.home() / "Library/Application Support/Granola/supabase.json"
-API_BASE_URL = "https://api.granola.ai"
+# Both can be pointed elsewhere (e.g. at mock_granola_server.py) for testing and benchmarks.
+CREDS_FILE = Path(os.environ.get("GRANOLA_CREDS_FILE") or
+                  Path.home() / "Library/Application Support/Granola/supabase.json")
+API_BASE_URL = os.environ.get("GRANOLA_API_BASE_URL", "https://api.granola.ai").rstrip("/")
 USER_AGENT = "Granola/5.354.0"
 DEFAULT_LIMIT = 100
+DEFAULT_POOL_SIZE = 10
+DEFAULT_WORKERS = 1
+DEFAULT_ASYNC_CONCURRENCY = 32
+DEFAULT_PREFETCH = 1         # get-documents pages requested ahead of the one being synced
+DEFAULT_MIN_PAGE_SIZE = 10    # bounds of the auto-tuned get-documents page size
+DEFAULT_MAX_PAGE_SIZE = 100
+PAGE_TARGET_BYTES = 2 * 1024 * 1024  # decoded size a get-documents page should stay under
+PAGE_TARGET_SECONDS = 3.0     # and the time it should take
+STREAM_THRESHOLD = 1024 * 1024  # transcript responses larger than this (on the wire) are decoded incrementally
+STREAM_CHUNK_SIZE = 64 * 1024
+DEFAULT_PAGE_OVERLAP = 2     # documents each get-documents page re-reads from the previous one
+DEFAULT_STOP_AFTER_KNOWN = 20  # consecutive already-synced documents that end an incremental listing
+DEFAULT_PRIORITY_WINDOW = 100  # most listed documents held back to sync the most recently created first
+STATE_FILENAME = ".granola_sync_state.json"
+MANIFEST_FILENAME = ".granola_manifest.db"
+PANEL_BATCH_SIZE = 25        # documents per get-documents-batch request in two-phase listing
+CACHE_DIRNAME = ".granola_cache"
+DEFAULT_CACHE_MAX_MB = 256
+STORE_DIRNAME = ".granola_store"
+DEFAULT_RATE = 20.0          # requests/second budget shared by every endpoint
+MAX_THROTTLE_RETRIES = 5     # resends of a single request after HTTP 429
+DEFAULT_MAX_RETRIES = 4      # resends after 5xx, timeouts and connection errors
+DEFAULT_BREAKER_THRESHOLD = 0.5  # failed share of recent requests that stops the run
+REQUEST_TIMEOUT = (10, 120)  # (connect, read) seconds
+TOKEN_REFRESH_MARGIN = 300   # reload the credentials this many seconds before the token expires
+TOKEN_WAIT = 60              # after a 401, how long to wait for Granola to write a fresh token
 
 # --- Logging Setup ---
 logging.basicConfig(
@@ -27,11 +82,36 @@ logging.basicConfig(
     ]
 )
 logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+# --- JSON ---
+# orjson when installed (GRANOLA_JSON=json forces the standard library).
+# The canonical (compact, sorted) encodings of the two backends only differ
+# for floats in exponent notation (1e16 vs 1e+16); a payload containing one
+# is then simply stored under a second digest.
+JSON_BACKEND = "orjson" if orjson is not None and os.environ.get("GRANOLA_JSON", "orjson") != "json" else "json"
+
+def json_loads(data: Any) -> Any:
+    """Decodes JSON from bytes or str."""
+    if JSON_BACKEND == "orjson":
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(obj: Any, sort_keys: bool = False, indent: bool = False) -> bytes:
+    """Encodes to UTF-8 JSON: compact, or indented by two spaces."""
+    if JSON_BACKEND == "orjson":
+        option = (orjson.OPT_SORT_KEYS if sort_keys else 0) | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, option=option)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits, which the standard library handles
+    return json.dumps(obj, sort_keys=sort_keys, ensure_ascii=False, indent=2 if indent else None,
+                      separators=(',', ': ') if indent else (',', ':')).encode('utf-8')
 
 
 def check_platform():
     """Verify we're running on macOS where Granola stores credentials."""
-    if platform.system() != "Darwin":
+    if platform.system() != "Darwin" and not os.environ.get("GRANOLA_CREDS_FILE"):
         logger.error(
             f"Unsupported platform: {platform.system()}. "
             "Granola stores credentials in ~/Library/Application Support/, "
@@ -39,96 +119,1190 @@ def check_platform():
         )
         sys.exit(1)
 
-def load_access_token() -> Optional[str]:
-    """Retrieves the access token from the local Granola configuration file."""
+def load_credentials() -> Optional[Tuple[str, Optional[float]]]:
+    """Reads the access token and its expiry (epoch seconds, if known) from the Granola config file."""
     if not CREDS_FILE.exists():
         logger.error(f"Credentials file missing at: {CREDS_FILE}")
         return None
         
     try:
-        with open(CREDS_FILE, 'r') as f:
-            data = json.load(f)
+        with open(CREDS_FILE, 'rb') as f:
+            data = json_loads(f.read())
             
         if 'workos_tokens' not in data:
             logger.error("workos_tokens key missing in credentials.")
             return None
 
-        workos_tokens = json.loads(data['workos_tokens'])
+        workos_tokens = json_loads(data['workos_tokens'])
         token = workos_tokens.get('access_token')
         
         if not token:
             logger.error("Access token is null or empty.")
             return None
             
-        return token
+        return token, token_expiry(token, workos_tokens)
         
     except (json.JSONDecodeError, OSError) as e:
         logger.error(f"Failed to parse credentials: {e}")
         return None
 
-def get_headers(token: str) -> Dict[str, str]:
+def load_access_token() -> Optional[str]:
+    """Retrieves the access token from the local Granola configuration file."""
+    credentials = load_credentials()
+    return credentials[0] if credentials else None
+
+def token_expiry(token: str, workos_tokens: Dict[str, Any]) -> Optional[float]:
+    """Expiry of the access token: the JWT `exp` claim, else obtained_at + expires_in."""
+    try:
+        claims = token.split(".")[1]
+        return float(json_loads(base64.urlsafe_b64decode(claims + "=" * (-len(claims) % 4)))["exp"])
+    except (IndexError, ValueError, KeyError, TypeError):
+        pass
+    try:
+        return float(workos_tokens["obtained_at"]) / 1000 + float(workos_tokens["expires_in"])
+    except (KeyError, ValueError, TypeError):
+        return None
+
+class TokenProvider:
+    """
+    The access token for a run, kept fresh from the credentials file, which
+    the Granola desktop app rewrites whenever it refreshes its session.
+    current() reloads the file once the token is within TOKEN_REFRESH_MARGIN
+    of expiring; refresh() is called after a 401 and waits up to `wait`
+    seconds for a different token to appear. Thread-safe.
+    """
+
+    def __init__(self, token: str, expires_at: Optional[float] = None, wait: float = TOKEN_WAIT):
+        self.token = token
+        self.expires_at = expires_at
+        self.wait = wait
+        self.refreshes = 0
+        self._checked = 0.0
+        self._abandoned: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls) -> Optional["TokenProvider"]:
+        credentials = load_credentials()
+        if not credentials:
+            return None
+        provider = cls(*credentials)
+        provider.log_expiry()
+        return provider
+
+    def log_expiry(self):
+        if self.expires_at is None:
+            return
+        remaining = self.expires_at - time.time()
+        expires = datetime.fromtimestamp(self.expires_at).strftime('%H:%M:%S')
+        if remaining <= 0:
+            logger.warning(f"Access token expired at {expires}; waiting for Granola to refresh it as needed.")
+        else:
+            logger.info(f"Access token expires at {expires} (in {remaining / 60:.0f} min).")
+
+    def _reload(self) -> bool:
+        """Re-reads the credentials file; True when it holds a different token."""
+        credentials = load_credentials()
+        if not credentials or credentials[0] == self.token:
+            return False
+        self.token, self.expires_at = credentials
+        self.refreshes += 1
+        logger.info("Loaded a refreshed access token.")
+        self.log_expiry()
+        return True
+
+    def current(self) -> str:
+        if self.expires_at is not None and time.time() > self.expires_at - TOKEN_REFRESH_MARGIN:
+            with self._lock:
+                # Don't re-read the file on every request while Granola hasn't refreshed it yet.
+                if time.monotonic() - self._checked > 5:
+                    self._checked = time.monotonic()
+                    self._reload()
+        return self.token
+
+    def refresh(self, rejected: str) -> bool:
+        """After `rejected` got a 401: True once a different token is available to retry with."""
+        with self._lock:
+            if self.token != rejected:
+                return True  # another request already picked up the new token
+            if self._reload():
+                return True
+            if self._abandoned == rejected:
+                return False  # already waited for this one; don't stall every request
+            logger.warning(f"Access token rejected (401); waiting up to {self.wait:.0f}s for a fresh one. "
+                           "Is the Granola app running and logged in?")
+            deadline = time.monotonic() + self.wait
+            while time.monotonic() < deadline:
+                time.sleep(min(2.0, deadline - time.monotonic()))
+                if self._reload():
+                    return True
+            logger.error("No fresh access token appeared; requests will keep failing until Granola refreshes it.")
+            self._abandoned = rejected
+            return False
+
+def accept_encoding(supported: Iterable[str]) -> str:
+    """Lists the encodings the HTTP library can decode, best compression first."""
+    supported = {encoding.strip() for encoding in supported}
+    return ", ".join(e for e in ("zstd", "br", "gzip", "deflate") if e in supported)
+
+def get_headers(token: str, encodings: Iterable[str] = URLLIB3_ENCODINGS.split(",")) -> Dict[str, str]:
     return {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json",
         "Accept": "*/*",
+        "Accept-Encoding": accept_encoding(encodings),
         "User-Agent": USER_AGENT,
         "X-Client-Version": USER_AGENT.split('/')[1]
     }
 
-def fetch_documents(token: str, limit: int = DEFAULT_LIMIT) -> List[Dict[str, Any]]:
-    """Retrieves metadata for all available Granola documents with pagination."""
-    url = f"{API_BASE_URL}/v2/get-documents"
-    all_docs = []
-    offset = 0
-    page_size = min(limit, 100)
-
-    while True:
-        payload = {
-            "limit": page_size,
-            "offset": offset,
-            "include_last_viewed_panel": True
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header (delta-seconds or HTTP-date) into seconds from now."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+def is_large_body(headers: Any) -> bool:
+    """
+    True when a response body may be bigger than STREAM_THRESHOLD: it says
+    so, or its length is unknown (e.g. chunked). Such a body is left for
+    read_head to tell apart.
+    """
+    length = headers.get("Content-Length")
+    return not (length and length.isdigit()) or int(length) > STREAM_THRESHOLD
+
+def read_head(chunks: Iterator[bytes]) -> Tuple[bytes, bool]:
+    """
+    Reads a body until it ends or grows past STREAM_THRESHOLD. Returns the
+    bytes read and whether that was the whole body; if not, the rest is
+    still in `chunks`.
+    """
+    head = bytearray()
+    for chunk in chunks:
+        head += chunk
+        if len(head) > STREAM_THRESHOLD:
+            return bytes(head), False
+    return bytes(head), True
+
+async def read_head_async(chunks: AsyncIterator[bytes]) -> Tuple[bytes, bool]:
+    """read_head for an async body."""
+    head = bytearray()
+    async for chunk in chunks:
+        head += chunk
+        if len(head) > STREAM_THRESHOLD:
+            return bytes(head), False
+    return bytes(head), True
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+class RateLimiter:
+    """
+    Adaptive token bucket shared by every API call of a run.
+
+    Each request takes one token; tokens refill at `rate` per second up to
+    `burst`. An HTTP 429 halves the rate and pauses all callers for the
+    Retry-After period. The rate is cut once per throttling episode: 429s
+    to requests that took their token before the last cut only extend the
+    pause, so a window of in-flight requests rejected together doesn't
+    drive the rate to the floor. Every healthy response to a request
+    reserved since the last cut nudges the rate back up towards the
+    configured budget. Thread-safe, and engine-agnostic:
+    reserve() only computes the wait, the caller decides how to sleep.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, burst: Optional[float] = None, min_rate: float = 0.5):
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.capacity = burst or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.throttled_seconds = 0.0  # wall-clock time during which callers were held back
+        self.throttle_events = 0
+        self._throttled_until = 0.0
+        self._last_cut = float("-inf")
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes a token and returns how many seconds the caller must wait before sending."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            wait = max(wait, self.paused_until - now)
+            if wait > 0:
+                self.throttled_seconds += max(now + wait - max(now, self._throttled_until), 0.0)
+                self._throttled_until = max(self._throttled_until, now + wait)
+            return wait
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def on_response(self, status_code: int, retry_after: Optional[str] = None,
+                    reserved_at: Optional[float] = None):
+        """Adapts to a response; `reserved_at` is the time.monotonic() its request called reserve() at."""
+        with self._lock:
+            current = reserved_at is None or reserved_at >= self._last_cut
+            if status_code == 429:
+                self.throttle_events += 1
+                if current:
+                    self.rate = max(self.min_rate, self.rate / 2)
+                    self._last_cut = time.monotonic()
+                pause = parse_retry_after(retry_after)
+                if pause is None:
+                    pause = 1.0 / self.rate
+                self.paused_until = max(self.paused_until, time.monotonic() + pause)
+                # Drain the bucket so the burst can't fire again right after the pause.
+                self.tokens = min(self.tokens, 0.0)
+            elif status_code < 500 and current:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+    def log_stats(self):
+        logger.info(
+            f"Rate limiter: {self.throttled_seconds:.1f}s spent throttled, "
+            f"{self.throttle_events} x HTTP 429, final rate {self.rate:.1f} req/s"
+        )
+
+class RetryPolicy:
+    """
+    Decides which failures are worth resending and how long to back off.
+
+    Server errors (5xx, 408), timeouts and dropped connections are retried
+    up to `max_retries` times with capped exponential backoff and full
+    jitter; anything else (401/403 and other 4xx) is fatal and returned
+    to the caller straight away. Retries are counted per endpoint.
+    """
+
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = 0.5, max_delay: float = 30.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = Counter()
+        self._lock = threading.Lock()
+
+    def should_retry(self, status_code: int) -> bool:
+        return status_code == 408 or status_code >= 500
+
+    def next_delay(self, endpoint: str, attempt: int) -> float:
+        """Records retry number `attempt` (1-based) of `endpoint` and returns its backoff."""
+        with self._lock:
+            self.retries[endpoint] += 1
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def log_stats(self):
+        if not self.retries:
+            return
+        summary = ", ".join(f"{endpoint}={count}" for endpoint, count in sorted(self.retries.items()))
+        logger.info(f"Retries: {summary}")
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+class CircuitBreaker:
+    """
+    Stops a run from hammering an API that is down.
+
+    Every request attempt is recorded: transport errors and 5xx/408 are
+    failures, any other answer (including 404 and 429) shows the API is up.
+    When the failure rate over the last `window` attempts reaches
+    `threshold`, the breaker opens and requests are refused. After a
+    cooldown it half-opens and lets a single probe through: success closes
+    it again, failure re-opens it with a doubled cooldown. A run that can't
+    wait (`max_outage` of 0, the default) gives up as soon as it opens.
+    Thread-safe and engine-agnostic, like RateLimiter.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, threshold: float = DEFAULT_BREAKER_THRESHOLD, window: int = 20, min_calls: int = 10,
+                 cooldown: float = 5.0, max_cooldown: float = 60.0, max_outage: float = 0.0):
+        self.threshold = threshold
+        self.min_calls = min(min_calls, window)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_outage = max_outage
+        self.outcomes = deque(maxlen=window)
+        self.state = self.CLOSED
+        self.cooldown = cooldown
+        self.opened_at = 0.0
+        self.outage_started = 0.0
+        self.trips = 0
+        self.gave_up = False  # the outage outlasted max_outage; the run should stop
+        self._lock = threading.Lock()
+
+    def reserve(self) -> Optional[float]:
+        """
+        Returns 0 when a request may be sent, the seconds to wait before
+        asking again while a probe is pending, or None to give up.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            now = time.monotonic()
+            if self.state == self.OPEN and now >= self.opened_at + self.cooldown:
+                self.state = self.HALF_OPEN
+                logger.info("Circuit breaker half-open; probing the API.")
+                return 0.0
+            if now - self.outage_started >= self.max_outage:
+                self.gave_up = True
+                return None
+            if self.state == self.OPEN:
+                return min(self.opened_at + self.cooldown - now, self.outage_started + self.max_outage - now)
+            return min(self.base_cooldown / 4, self.outage_started + self.max_outage - now)
+
+    def record(self, ok: bool):
+        with self._lock:
+            now = time.monotonic()
+            if self.state == self.HALF_OPEN:
+                if ok:
+                    logger.info(f"Circuit breaker closed; API recovered after {now - self.outage_started:.1f}s.")
+                    self.state = self.CLOSED
+                    self.cooldown = self.base_cooldown
+                    self.outcomes.clear()
+                else:
+                    self.state = self.OPEN
+                    self.opened_at = now
+                    self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                return
+            if self.state == self.OPEN or self.threshold <= 0:
+                return  # late answers to requests sent before the breaker opened
+            self.outcomes.append(ok)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= self.min_calls and failures / len(self.outcomes) >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = self.outage_started = now
+                self.trips += 1
+                if self.max_outage > 0:
+                    action = f"waiting up to {self.max_outage:.0f}s for the API to recover"
+                else:
+                    action = "no further requests will be sent"
+                logger.error(f"Circuit breaker open: {failures}/{len(self.outcomes)} recent API requests failed; {action}.")
+
+    def log_stats(self):
+        if self.trips:
+            logger.info(f"Circuit breaker: tripped {self.trips} time(s), now {self.state}")
+
+class RunBudget:
+    """
+    Wall-clock and request budget of a run (--max-duration, --max-requests;
+    0 means unlimited). Once it is spent, no further documents are started:
+    the ones in flight finish, and the rest are left in the sync state for
+    the next run to resume (see Backlog). Thread-safe.
+    """
+
+    def __init__(self, max_seconds: float = 0, max_requests: int = 0):
+        self.max_seconds = max_seconds
+        self.max_requests = max_requests
+        self.started = time.monotonic()
+        self.requests = 0
+        self.spent: Optional[str] = None  # what ran out, once something has
+        self._lock = threading.Lock()
+
+    def spend(self):
+        """Counts one request sent."""
+        with self._lock:
+            self.requests += 1
+
+    @property
+    def exhausted(self) -> bool:
+        if self.spent is None:
+            with self._lock:
+                if self.spent is None:
+                    if self.max_requests and self.requests >= self.max_requests:
+                        self.spent = f"{self.requests} requests"
+                    elif self.max_seconds and time.monotonic() - self.started >= self.max_seconds:
+                        self.spent = f"{self.max_seconds:g}s"
+                    if self.spent:
+                        logger.warning(f"Run budget spent ({self.spent}); finishing the documents in flight.")
+        return self.spent is not None
+
+class TransferStats:
+    """Per-endpoint response bytes: as transferred (compressed) and as decoded."""
+
+    def __init__(self):
+        self.wire = Counter()
+        self.decoded = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, wire_bytes: int, decoded_bytes: int):
+        with self._lock:
+            self.wire[endpoint] += wire_bytes
+            self.decoded[endpoint] += decoded_bytes
+
+    def log_stats(self):
+        if not self.decoded:
+            return
+        summary = ", ".join(
+            f"{endpoint}={format_bytes(self.wire[endpoint])}/{format_bytes(n)}"
+            for endpoint, n in sorted(self.decoded.items())
+        )
+        wire, decoded = sum(self.wire.values()), sum(self.decoded.values())
+        ratio = f", {100 * (1 - wire / decoded):.0f}% saved by compression" if decoded else ""
+        logger.info(f"Received (wire/decoded): {summary}; total {format_bytes(wire)}/{format_bytes(decoded)}{ratio}")
+
+class CacheEntry:
+    def __init__(self, meta: Dict[str, Any], body: bytes):
+        self.meta = meta
+        self.body = body
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional-request headers for revalidating this entry."""
+        headers = {}
+        if self.meta.get("etag"):
+            headers["If-None-Match"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = self.meta["last_modified"]
+        return headers
+
+class HttpCache:
+    """
+    On-disk cache of API responses keyed by endpoint and document ID, for
+    responses that carry an ETag or Last-Modified validator. Each entry is
+    one file: a JSON metadata line followed by the raw (decoded) body. Use
+    order is tracked through file mtimes; once the total size exceeds
+    `max_bytes`, least recently used entries are evicted down to 90%.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self._scan())
+        if self.total_bytes > self.max_bytes:
+            self._evict()
+
+    def _path(self, endpoint: str, key: str) -> Path:
+        digest = hashlib.sha256(f"{endpoint}\0{key}".encode('utf-8')).hexdigest()
+        return self.directory / f"{digest}.entry"
+
+    def _scan(self) -> List[Tuple[Path, int, float]]:
+        entries = []
+        for path in self.directory.glob("*.entry"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def get(self, endpoint: str, key: str) -> Optional[CacheEntry]:
+        path = self._path(endpoint, key)
+        try:
+            with open(path, 'rb') as f:
+                meta = json_loads(f.readline())
+                body = f.read()
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(meta, body)
+
+    def put(self, endpoint: str, key: str, etag: Optional[str], last_modified: Optional[str], body: bytes):
+        if not (etag or last_modified):
+            return
+        path = self._path(endpoint, key)
+        meta = {"endpoint": endpoint, "key": key, "etag": etag, "last_modified": last_modified,
+                "stored_at": datetime.now(timezone.utc).isoformat()}
+        data = json_dumps(meta) + b"\n" + body
+        tmp_path = path.with_name(path.name + f".{threading.get_ident()}.tmp")
+        try:
+            old_size = path.stat().st_size if path.exists() else 0
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to cache {endpoint} {key}: {e}")
+            return
+        with self._lock:
+            self.stores += 1
+            self.total_bytes += len(data) - old_size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _evict(self):
+        target = self.max_bytes * 0.9
+        for path, size, _ in sorted(self._scan(), key=lambda entry: entry[2]):
+            if self.total_bytes <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            self.total_bytes -= size
+            self.evictions += 1
+
+    def info(self) -> Dict[str, Any]:
+        entries = self._scan()
+        mtimes = [mtime for _, _, mtime in entries]
+        return {
+            'directory': str(self.directory),
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'oldest_use': datetime.fromtimestamp(min(mtimes)).isoformat(timespec='seconds') if mtimes else None,
+            'newest_use': datetime.fromtimestamp(max(mtimes)).isoformat(timespec='seconds') if mtimes else None,
         }
 
+    def purge(self) -> int:
+        removed = 0
+        for path, _, _ in self._scan():
+            try:
+                path.unlink()
+                removed += 1
+            except OSError:
+                continue
+        self.total_bytes = 0
+        return removed
+
+    def log_stats(self):
+        logger.info(
+            f"Cache: {self.hits} revalidated (304), {self.misses} downloaded, {self.stores} stored, "
+            f"{self.evictions} evicted; {format_bytes(self.total_bytes)} of {format_bytes(self.max_bytes)}"
+        )
+
+class StartupTimer:
+    """
+    Times the local setup before the first API request (output directory,
+    stores, credentials, sync state) so time-to-first-request can be
+    compared across changes. Each mark() closes the phase since the last.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.phases: List[Tuple[str, float]] = []
+        self.preconnect: Optional["Preconnector"] = None
+        self._last = self.started
+
+    def mark(self, phase: str):
+        now = time.monotonic()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def log(self, first_request: Optional[float] = None):
+        parts = [f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in self.phases]
+        line = f"Startup: {', '.join(parts) or 'no setup'}"
+        preconnect = self.preconnect
+        if preconnect is not None and preconnect.ready is not None:
+            line += f"; API {preconnect.warmed} ready at {(preconnect.ready - self.started) * 1000:.0f} ms (in parallel)"
+        if first_request is not None:
+            line += f"; first request sent at {(first_request - self.started) * 1000:.0f} ms"
+        logger.info(line)
+
+class Preconnector:
+    """
+    Opens the first API connection on a background thread while main()
+    prepares the output directory, credentials and sync state, so the TCP
+    and TLS handshakes are out of the way when the first request is sent.
+
+    For the sync engine the connection is made in the pool of the
+    HTTPAdapter later handed to GranolaClient, exactly as requests would
+    pick it, and left there idle. httpx connections belong to the event
+    loop that opens them, so for the async engine only the host name is
+    resolved, which warms the system resolver cache. Nothing is warmed when
+    a proxy applies; any failure is left for the first request to report.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, adapter: Optional[HTTPAdapter] = None):
+        self.base_url = base_url or API_BASE_URL
+        self.adapter = adapter
+        self.warmed = "connection" if adapter is not None else "host name"
+        self.ready: Optional[float] = None
+        self._thread = threading.Thread(target=self._run, name="preconnect", daemon=True)
+
+    def start(self) -> "Preconnector":
+        self._thread.start()
+        return self
+
+    def join(self, timeout: float = REQUEST_TIMEOUT[0]) -> Optional[HTTPAdapter]:
+        """Waits for the warm-up (at most `timeout` seconds); returns the adapter to use."""
+        self._thread.join(timeout)
+        return self.adapter
+
+    def _run(self):
+        url = f"{self.base_url}/"
+        settings = requests.Session().merge_environment_settings(url, {}, None, None, None)
+        if requests.utils.select_proxy(url, settings["proxies"]):
+            return
         try:
-            response = requests.post(url, headers=get_headers(token), json=payload)
-            response.raise_for_status()
-            data = response.json()
-            docs = data.get("docs", [])
-        except requests.RequestException as e:
-            logger.error(f"API Error (get-documents, offset={offset}): {e}")
-            break
+            if self.adapter is None:
+                parsed = urlsplit(url)
+                socket.getaddrinfo(parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80),
+                                   type=socket.SOCK_STREAM)
+            else:
+                request = requests.Request("POST", url).prepare()
+                if hasattr(self.adapter, "get_connection_with_tls_context"):
+                    pool = self.adapter.get_connection_with_tls_context(request, settings["verify"],
+                                                                        settings["proxies"], settings["cert"])
+                else:  # requests < 2.32
+                    pool = self.adapter.get_connection(url, settings["proxies"])
+                    self.adapter.cert_verify(pool, url, settings["verify"], settings["cert"])
+                conn = pool._get_conn()
+                try:
+                    conn.timeout = REQUEST_TIMEOUT[0]
+                    conn.connect()
+                finally:
+                    pool._put_conn(conn)
+        except Exception as e:
+            # Best effort, and _get_conn()/_put_conn() are urllib3 internals:
+            # whatever goes wrong is left for the first request.
+            logger.info(f"Could not warm up the API {self.warmed} ({e}); the first request will retry.")
+            return
+        self.ready = time.monotonic()
+
+class GranolaClient:
+    """
+    Sync-scoped API client. Holds one keep-alive session with a sized
+    connection pool and pre-built headers, so every page and transcript
+    request reuses an open TCP+TLS connection instead of opening a new one.
+    """
+
+    RETRYABLE_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+    def __init__(self, token: Union[str, TokenProvider], pool_size: int = DEFAULT_POOL_SIZE,
+                 limiter: Optional[RateLimiter] = None, retry: Optional[RetryPolicy] = None,
+                 cache: Optional[HttpCache] = None, breaker: Optional[CircuitBreaker] = None,
+                 base_url: Optional[str] = None, budget: Optional[RunBudget] = None,
+                 adapter: Optional[HTTPAdapter] = None):
+        self.tokens = token if isinstance(token, TokenProvider) else TokenProvider(token)
+        self.base_url = base_url or API_BASE_URL
+        self.budget = budget or RunBudget()
+        self.limiter = limiter or RateLimiter()
+        self.retry = retry or RetryPolicy()
+        self.cache = cache
+        self.breaker = breaker or CircuitBreaker()
+        self.transfer = TransferStats()
+        self.first_request: Optional[float] = None  # time.monotonic() when the first request went out
+        self.session = requests.Session()
+        self.session.headers.update(get_headers(self.tokens.token))
+        self._adapter = adapter or self.make_adapter(pool_size)
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
 
-        if not docs:
-            break
+    @staticmethod
+    def make_adapter(pool_size: int = DEFAULT_POOL_SIZE) -> HTTPAdapter:
+        """The connection pool of a client; built ahead of it when a Preconnector warms it up."""
+        return HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
 
-        all_docs.extend(docs)
+    def post(self, endpoint: str, payload: Dict[str, Any],
+             headers: Optional[Dict[str, str]] = None, stream: bool = False) -> requests.Response:
+        """
+        POSTs through the rate limiter. HTTP 429 is resent once the limiter
+        allows; transient failures are resent per the retry policy. The last
+        response is returned (or the last transport error raised) when
+        retries run out or the failure is fatal. With `stream`, the body of
+        a large (see is_large_body) 200 response is left unread for the
+        caller to consume, close and account in `transfer`. A 401 is resent
+        once with a refreshed access token (see TokenProvider).
+        """
+        retries = throttles = 0
+        reauthorized = False
+        while True:
+            wait = self.breaker.reserve()
+            while wait:
+                time.sleep(wait)
+                wait = self.breaker.reserve()
+            if wait is None:
+                raise CircuitOpenError(f"circuit breaker open, not sending {endpoint}")
+            reserved = time.monotonic()
+            self.limiter.acquire()
+            self.budget.spend()
+            if self.first_request is None:
+                self.first_request = time.monotonic()
+            token = self.tokens.current()
+            started = time.monotonic()
+            try:
+                response = self.session.post(f"{self.base_url}{endpoint}", json=payload,
+                                             headers={**(headers or {}), "Authorization": f"Bearer {token}"},
+                                             timeout=REQUEST_TIMEOUT, stream=stream)
+                streaming = stream and response.status_code == 200 and is_large_body(response.headers)
+                if not streaming:
+                    # urllib3 decodes the body incrementally as it is read; tell()
+                    # reports how many (compressed) bytes came off the socket.
+                    decoded = len(response.content)
+                    self.transfer.add(endpoint, response.raw.tell(), decoded)
+                # requests stops the clock at the headers; include the body download, as httpx does.
+                response.elapsed = timedelta(seconds=time.monotonic() - started)
+            except self.RETRYABLE_ERRORS as e:
+                self.breaker.record(ok=False)
+                if retries >= self.retry.max_retries:
+                    raise
+                failure = str(e)
+            else:
+                self.breaker.record(ok=not self.retry.should_retry(response.status_code))
+                self.limiter.on_response(response.status_code, response.headers.get("Retry-After"), reserved)
+                if response.status_code == 429 and throttles < MAX_THROTTLE_RETRIES:
+                    throttles += 1
+                    logger.warning(f"Throttled (429) on {endpoint}; slowing down to {self.limiter.rate:.1f} req/s")
+                    continue
+                if response.status_code == 401 and not reauthorized:
+                    reauthorized = True
+                    if self.tokens.refresh(token):
+                        continue
+                if not self.retry.should_retry(response.status_code) or retries >= self.retry.max_retries:
+                    return response
+                failure = f"HTTP {response.status_code}"
 
-        if len(all_docs) >= limit:
-            all_docs = all_docs[:limit]
-            break
+            retries += 1
+            delay = self.retry.next_delay(endpoint, retries)
+            logger.warning(f"{endpoint} failed ({failure}); retry {retries}/{self.retry.max_retries} in {delay:.1f}s")
+            time.sleep(delay)
 
-        if len(docs) < page_size:
-            break
+    def connection_stats(self) -> Dict[str, int]:
+        """Requests sent vs. connections opened, summed over the pooled hosts."""
+        requests_sent = 0
+        connections_opened = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_sent += pool.num_requests
+            connections_opened += pool.num_connections
+        return {
+            'requests': requests_sent,
+            'connections': connections_opened,
+            'reused': max(requests_sent - connections_opened, 0),
+        }
+
+    def log_stats(self):
+        stats = self.connection_stats()
+        logger.info(
+            f"HTTP: {stats['requests']} requests over {stats['connections']} connections "
+            f"({stats['reused']} reused)"
+        )
+        self.transfer.log_stats()
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self) -> "GranolaClient":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def response_json(response: requests.Response, content: Optional[bytes] = None) -> Any:
+    """
+    Decodes a response body (or `content`, when it was read by hand) with
+    json_loads. A body that isn't JSON (e.g. a proxy's error page) raises a
+    RequestException, as Response.json() does, so it is handled like any
+    other failed API call.
+    """
+    try:
+        return json_loads(response.content if content is None else content)
+    except ValueError as e:
+        raise requests.exceptions.InvalidJSONError(f"Invalid JSON from {response.url}: {e}", response=response)
+
+def response_docs(data: Any, url: str) -> List[Dict[str, Any]]:
+    """The "docs" list of a decoded get-documents(-batch) response; raises ValueError for any other shape."""
+    try:
+        docs = data.get("docs", [])
+    except AttributeError:
+        docs = None
+    if not isinstance(docs, list):
+        raise ValueError(f"Unexpected response from {url}: no list of documents")
+    return docs
+
+def documents_of(response: requests.Response) -> List[Dict[str, Any]]:
+    """The documents in a get-documents(-batch) response; a malformed body raises a RequestException."""
+    try:
+        return response_docs(response_json(response), response.url)
+    except ValueError as e:
+        raise requests.exceptions.InvalidJSONError(str(e), response=response)
+
+def fetch_document_page(client: GranolaClient, offset: int, page_size: int,
+                        include_panels: bool = True, sizer: Optional["PageSizer"] = None) -> List[Dict[str, Any]]:
+    """Fetches one /v2/get-documents page; its size and latency are reported to `sizer`."""
+    payload = {
+        "limit": page_size,
+        "offset": offset,
+        "include_last_viewed_panel": include_panels
+    }
+
+    try:
+        response = client.post("/v2/get-documents", payload)
+        response.raise_for_status()
+        docs = documents_of(response)
+        if sizer is not None:
+            sizer.observe(len(docs), len(response.content), response.elapsed.total_seconds())
+        return docs
+    except CircuitOpenError:
+        raise
+    except requests.RequestException as e:
+        logger.error(f"API Error (get-documents, offset={offset}): {e}")
+        raise
+
+class PageStitcher:
+    """
+    Makes offset pagination safe against documents created or deleted while
+    the listing runs. Consecutive pages are requested `overlap` documents
+    apart, so a page normally starts with the tail of the previous one.
+    Documents seen before are dropped by ID, so an insertion above the
+    boundary only produces duplicates. A page sharing no ID with the
+    previous one means deletions above shifted documents past the
+    boundary; the boundary is then re-read one page earlier to recover them.
+    Documents admitted from outside the listing (see Backlog) and listed
+    again are dropped too, but are not drift.
+    """
+
+    def __init__(self, overlap: int = DEFAULT_PAGE_OVERLAP):
+        self.overlap = overlap
+        self.seen: Set[str] = set()
+        self.admitted: Set[str] = set()
+        self.position = 0  # offset of the page being handed out; a stopped listing resumes there
+        self.duplicates = 0  # beyond the planned overlap
+        self.relisted = 0  # admitted documents the listing reached again
+        self.recovered = 0
+        self.rereads = 0
+
+    def stride(self, page_size: int) -> int:
+        """Offset step between pages; leaves at least one new document per page."""
+        return page_size - min(self.overlap, page_size - 1)
+
+    def stitch(self, docs: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
+        """Returns the page's unseen documents, and whether the boundary before it needs a re-read."""
+        if not self.seen:
+            return self._unseen(docs), False
+        fresh = self._unseen(docs)
+        relisted = sum(1 for doc in docs if doc.get("id") in self.admitted)
+        self.relisted += relisted
+        self.duplicates += max(len(docs) - len(fresh) - relisted - self.overlap, 0)
+        return fresh, self.overlap > 0 and len(fresh) == len(docs)
+
+    def admit(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Returns the documents not seen yet, from outside the paged listing."""
+        fresh = self._unseen(docs)
+        self.admitted.update(doc.get("id") for doc in fresh)
+        return fresh
+
+    def recover(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Returns the documents of a boundary re-read that the listing had skipped."""
+        self.rereads += 1
+        fresh = self._unseen(docs)
+        self.recovered += len(fresh)
+        return fresh
+
+    def _unseen(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        fresh = []
+        for doc in docs:
+            doc_id = doc.get("id")
+            if doc_id in self.seen:
+                continue
+            if doc_id:
+                self.seen.add(doc_id)
+            fresh.append(doc)
+        return fresh
+
+    def log_stats(self):
+        if self.duplicates or self.rereads:
+            logger.info(
+                f"Listing drift: {self.duplicates} duplicate documents dropped, "
+                f"{self.recovered} recovered with {self.rereads} boundary re-reads"
+            )
+        if self.relisted:
+            logger.info(f"Resumed listing: {self.relisted} documents already fetched by ID were listed again")
+
+class PageSizer:
+    """
+    Chooses the get-documents page size from the pages seen so far. Response
+    size and latency grow roughly linearly with the page size, so each page
+    is sized to just meet the byte and time targets, based on smoothed
+    per-document costs. Since a fixed per-request overhead inflates the
+    per-document time of small pages, this converges on the largest page
+    that meets the latency target: the best throughput within the bounds.
+    Heavy meetings shrink the page, light ones (or --two-phase) grow it.
+    The size changes by at most 2x per page and stays within
+    [min_size, max_size]; a run starts from `initial` (the size the last
+    run settled on) or max_size.
+    """
+
+    def __init__(self, min_size: int = DEFAULT_MIN_PAGE_SIZE, max_size: int = DEFAULT_MAX_PAGE_SIZE,
+                 target_bytes: float = PAGE_TARGET_BYTES, target_seconds: float = PAGE_TARGET_SECONDS,
+                 initial: Optional[int] = None):
+        self.min_size = max(min(min_size, max_size), 1)
+        self.max_size = max(max_size, 1)
+        self.target_bytes = target_bytes
+        self.target_seconds = target_seconds
+        self.size = min(max(initial or self.max_size, self.min_size), self.max_size)
+        self.bytes_per_doc: Optional[float] = None
+        self.seconds_per_doc: Optional[float] = None
+        self.chosen: List[int] = []
+        self._lock = threading.Lock()
+
+    def next_size(self, limit: int) -> int:
+        """Returns (and records) the size of the next page to request."""
+        with self._lock:
+            size = min(self.size, max(limit, 1))
+            self.chosen.append(size)
+            return size
+
+    def observe(self, docs: int, nbytes: int, seconds: float):
+        if docs <= 0:
+            return
+        with self._lock:
+            self.bytes_per_doc = self._smooth(self.bytes_per_doc, nbytes / docs)
+            self.seconds_per_doc = self._smooth(self.seconds_per_doc, seconds / docs)
+            ideal = min(self.target_bytes / max(self.bytes_per_doc, 1.0),
+                        self.target_seconds / max(self.seconds_per_doc, 1e-6))
+            ideal = min(max(ideal, self.size / 2), self.size * 2)
+            self.size = int(min(max(ideal, self.min_size), self.max_size))
+
+    @staticmethod
+    def _smooth(average: Optional[float], sample: float) -> float:
+        return sample if average is None else 0.5 * average + 0.5 * sample
+
+    def log_stats(self):
+        if not self.chosen:
+            return
+        chosen = sorted(self.chosen)
+        summary = (f"Page sizes: {len(chosen)} pages of {chosen[0]}-{chosen[-1]} documents "
+                   f"(median {chosen[len(chosen) // 2]}, next run starts at {self.size})")
+        if self.bytes_per_doc is not None:
+            summary += (f" (~{format_bytes(self.bytes_per_doc)} and "
+                        f"{self.seconds_per_doc * 1000:.0f} ms per document)")
+        logger.info(summary)
+
+def iter_documents(client: GranolaClient, limit: int = DEFAULT_LIMIT, prefetch: int = DEFAULT_PREFETCH,
+                   include_panels: bool = True, stitcher: Optional[PageStitcher] = None,
+                   sizer: Optional[PageSizer] = None, start: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Yields Granola documents page by page, so syncing can start before the
+    listing finishes and only one page of metadata is held at a time.
+
+    With prefetch > 0, up to that many following pages are requested in the
+    background while the current one is consumed. Pages beyond `limit` are
+    never requested, and nothing past the first short page is used.
+    Without include_panels the documents carry no last_viewed_panel (see
+    PanelFetcher for the second phase). Pages overlap and are deduplicated
+    by `stitcher`, so each document is yielded once even if the listing
+    shifts underneath. Each page is sized by `sizer` from the ones before.
+    The listing begins at offset `start`.
+    """
+    stitcher = stitcher or PageStitcher()
+    sizer = sizer or PageSizer()
+    next_offset = covered = start  # covered: end of the last scheduled page
+    previous = None
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=prefetch, thread_name_prefix="granola-list") if prefetch > 0 else None
+
+    def schedule():
+        nonlocal next_offset, covered
+        size = sizer.next_size(limit)
+        if executor:
+            future = executor.submit(fetch_document_page, client, next_offset, size, include_panels, sizer)
+        else:
+            future = None
+        pending.append((next_offset, size, future))
+        covered = next_offset + size
+        next_offset += stitcher.stride(size)
+
+    yielded = 0
+    try:
+        schedule()
+        while pending:
+            offset, size, future = pending.popleft()
+            if future is not None:
+                page = future.result()
+            else:
+                page = fetch_document_page(client, offset, size, include_panels, sizer)
+            if not page:
+                return
+            if len(page) == size:
+                # Full page: there may be more, so keep the prefetch queue topped up.
+                while len(pending) < max(prefetch, 1) and covered < limit:
+                    schedule()
+
+            docs, drifted = stitcher.stitch(page)
+            if drifted and previous:
+                logger.info(f"Listing shifted before offset {offset}; re-reading the page boundary.")
+                docs = stitcher.recover(fetch_document_page(client, *previous, include_panels)) + docs
+            docs = docs[:limit - yielded]
+            previous = (offset, size)
+
+            logger.info(f"Listed {len(docs)} documents (offset {offset}).")
+            stitcher.position = offset
+            yield from docs
+            yielded += len(docs)
+
+            if yielded >= limit or len(page) < size:
+                return
+    finally:
+        for *_, future in pending:
+            if future is not None:
+                future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+def fetch_documents(client: GranolaClient, limit: int = DEFAULT_LIMIT,
+                    prefetch: int = DEFAULT_PREFETCH) -> List[Dict[str, Any]]:
+    """Retrieves metadata for all available Granola documents with pagination."""
+    return list(iter_documents(client, limit, prefetch))
+
+def fetch_documents_batch(client: GranolaClient, doc_ids: List[str]) -> List[Dict[str, Any]]:
+    """Retrieves full documents (including last_viewed_panel) for specific IDs."""
+    payload = {"document_ids": doc_ids, "include_last_viewed_panel": True}
+
+    try:
+        response = client.post("/v1/get-documents-batch", payload)
+        response.raise_for_status()
+        return documents_of(response)
+    except CircuitOpenError:
+        raise
+    except requests.RequestException as e:
+        logger.error(f"API Error (get-documents-batch, {len(doc_ids)} documents): {e}")
+        raise
+
+class PanelFetcher:
+    """
+    Second phase of a two-phase listing. The listing is paged without panel
+    content; only documents that survive the new/changed filter are
+    re-fetched in full, in batches of `batch_size`. A document the batch
+    doesn't return is recorded as failed, so the next run fetches it by ID.
+    Keeps the numbers needed to estimate how much panel content the run did
+    not have to download.
+    """
+
+    def __init__(self, report: "SyncReport", state: "SyncState", batch_size: int = PANEL_BATCH_SIZE):
+        self.report = report
+        self.state = state
+        self.batch_size = batch_size
+        self.fetched = 0
+        self.panel_bytes = 0
+
+    def _merge(self, batch: List[Dict[str, Any]], full_docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        by_id = {doc.get("id"): doc for doc in full_docs}
+        merged = []
+        for doc in batch:
+            full_doc = by_id.get(doc.get("id"))
+            if full_doc is None:
+                logger.warning(f"No content returned for '{doc.get('title')}' ({doc.get('id')}); will retry next run.")
+                self.report.record(doc, False)
+                self.state.record(doc, False)
+                continue
+            self.fetched += 1
+            self.panel_bytes += len(json_dumps(full_doc.get("last_viewed_panel") or {}))
+            merged.append(full_doc)
+        return merged
+
+    def iter(self, client: GranolaClient, documents: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        batch = []
+        try:
+            for doc in documents:
+                batch.append(doc)
+                if len(batch) >= self.batch_size:
+                    yield from self._merge(batch, fetch_documents_batch(client, [d["id"] for d in batch]))
+                    batch = []
+            if batch:
+                yield from self._merge(batch, fetch_documents_batch(client, [d["id"] for d in batch]))
+        finally:
+            documents.close()
 
-        offset += len(docs)
-        time.sleep(0.1)
+    async def iter_async(self, client: "AsyncGranolaClient",
+                         documents: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        batch = []
+        try:
+            async for doc in documents:
+                batch.append(doc)
+                if len(batch) >= self.batch_size:
+                    for full_doc in self._merge(batch, await fetch_documents_batch_async(client, [d["id"] for d in batch])):
+                        yield full_doc
+                    batch = []
+            if batch:
+                for full_doc in self._merge(batch, await fetch_documents_batch_async(client, [d["id"] for d in batch])):
+                    yield full_doc
+        finally:
+            await documents.aclose()
 
-    return all_docs
+    def log_stats(self):
+        skipped = self.report.skipped
+        summary = f"Two-phase listing: fetched panels for {self.fetched} documents ({format_bytes(self.panel_bytes)})"
+        if self.fetched and skipped:
+            saved = self.panel_bytes / self.fetched * skipped
+            summary += f"; ~{format_bytes(saved)} of panel content skipped for {skipped} unchanged documents"
+        logger.info(summary)
 
-def fetch_transcript(token: str, doc_id: str) -> Optional[List[Dict[str, Any]]]:
-    """Retrieves the full transcript for a specific document ID."""
-    url = f"{API_BASE_URL}/v1/get-document-transcript"
+def fetch_transcript(client: GranolaClient, doc_id: str,
+                     writer: Optional["TranscriptWriter"] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    Retrieves the full transcript for a specific document ID. Returns None
+    when the document has no transcript (404); raises when the request
+    failed, so the caller can leave the document for the next run.
+    With a cache, a previously seen transcript is revalidated with a
+    conditional request and reused on 304 Not Modified.
+    With a writer, a large transcript is not materialized at all: its body
+    is streamed into the writer (writer.streamed is set, None returned).
+    Streamed transcripts are not cached. A body of unknown length is read
+    up to STREAM_THRESHOLD first and only streamed if it goes beyond.
+    """
+    endpoint = "/v1/get-document-transcript"
     payload = {"document_id": doc_id}
+    cached = client.cache.get(endpoint, doc_id) if client.cache else None
     
     try:
-        response = requests.post(url, headers=get_headers(token), json=payload)
+        response = client.post(endpoint, payload, headers=cached.validators() if cached else None,
+                                stream=writer is not None)
+        if response.status_code == 304 and cached:
+            client.cache.record(hit=True)
+            return json_loads(cached.body)
         if response.status_code == 404:
             return None
         response.raise_for_status()
-        return response.json()
+        body = None
+        if writer is not None and is_large_body(response.headers):
+            with response:
+                chunks = response.iter_content(STREAM_CHUNK_SIZE)
+                body, complete = read_head(chunks)
+                if not complete:
+                    writer.open()
+                    writer.feed(body)
+                    for chunk in chunks:
+                        writer.feed(chunk)
+                client.transfer.add(endpoint, response.raw.tell(), len(body) if complete else writer.bytes_read)
+            if not complete:
+                if client.cache:
+                    client.cache.record(hit=False)
+                return None
+        transcript = response_json(response, body)
+        if client.cache:
+            client.cache.record(hit=False)
+            client.cache.put(endpoint, doc_id, response.headers.get("ETag"),
+                             response.headers.get("Last-Modified"), body if body is not None else response.content)
+        return transcript
+    except CircuitOpenError:
+        raise
     except requests.RequestException as e:
         logger.error(f"API Error (transcript {doc_id}): {e}")
-        return None
+        raise
 
 def parse_prosemirror(node: Dict[str, Any]) -> str:
     """Recursively converts ProseMirror JSON structure into Markdown."""
@@ -266,14 +1440,11 @@ def extract_people(doc: Dict[str, Any]) -> Dict[str, Any]:
         'attendees': attendees_info
     }
 
-def sync_document(doc: Dict[str, Any], token: str, output_dir: Path) -> bool:
-    doc_id = doc.get("id")
+def document_path(doc: Dict[str, Any], output_dir: Path) -> Optional[Path]:
+    """Resolves (and creates the year folder for) the Markdown path of a document."""
     title = doc.get("title", "Untitled")
     created_at_str = doc.get('created_at', '')
 
-    if not doc_id:
-        return False
-
     # --- 1. Date Parsing & Folder Setup ---
     date_prefix = "0000-00-00"
     year_folder = "Unknown_Year"
@@ -293,17 +1464,16 @@ def sync_document(doc: Dict[str, Any], token: str, output_dir: Path) -> bool:
             target_dir.mkdir(parents=True, exist_ok=True)
         except OSError as e:
             logger.error(f"Failed to create directory {target_dir}: {e}")
-            return False
+            return None
 
     filename = f"{date_prefix} {sanitize_filename(title)}.md"
-    filepath = target_dir / filename
-
-    # --- CHECK IF EXISTS ---
-    if filepath.exists():
-        logger.info(f"Skipping existing: {filename}")
-        return True
+    return target_dir / filename
 
-    logger.info(f"Downloading new: {title}")
+def render_document(doc: Dict[str, Any], transcript_data: Optional[List[Dict[str, Any]]]) -> str:
+    """Builds the full Markdown file (frontmatter, notes, transcript) for a document."""
+    doc_id = doc.get("id")
+    title = doc.get("title", "Untitled")
+    created_at_str = doc.get('created_at', '')
 
     # --- 2. Content Parsing ---
     markdown_notes = ""
@@ -314,14 +1484,11 @@ def sync_document(doc: Dict[str, Any], token: str, output_dir: Path) -> bool:
             markdown_notes = parse_prosemirror(content)
 
     # --- 3. Participants & Transcript ---
-    transcript_data = fetch_transcript(token, doc_id)
-    
     people = extract_people(doc)
     creator_name = people['creator']['name']
     attendee_names = [a['name'] for a in people['attendees']]
 
     transcript_text = format_transcript(transcript_data, creator_name, attendee_names)
-    time.sleep(0.1)
 
     # --- 4. YAML Frontmatter ---
     def yaml_escape(value: str) -> str:
@@ -345,70 +1512,1845 @@ def sync_document(doc: Dict[str, Any], token: str, output_dir: Path) -> bool:
 
     frontmatter += "---\n\n"
     
-    full_content = frontmatter + markdown_notes + transcript_text
+    return frontmatter + markdown_notes + transcript_text
 
-    # --- 5. Save ---
-    try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(full_content)
-        return True
-    except IOError as e:
-        logger.error(f"Failed to write {filename}: {e}")
-        return False
+class JsonArrayStream:
+    """
+    Incremental decoder for a top-level JSON array: feed() it text as it
+    arrives and it returns the elements completed so far. Only the element
+    being decoded is buffered, so memory is bounded by the largest element
+    rather than the whole array.
+    """
 
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(
-        description="Export Granola meeting notes to local Markdown files."
-    )
-    parser.add_argument(
-        "-o", "--output-dir",
-        type=Path,
-        default=os.environ.get("GRANOLA_OUTPUT_DIR", str(DEFAULT_OUTPUT_DIR)),
-        help=f"Output directory for Markdown files (default: {DEFAULT_OUTPUT_DIR}). "
-             "Can also be set via GRANOLA_OUTPUT_DIR env var.",
-    )
-    parser.add_argument(
-        "-l", "--limit",
-        type=int,
-        default=int(os.environ.get("GRANOLA_LIMIT", "0")),
-        help="Maximum number of documents to fetch (default: all).",
-    )
-    return parser.parse_args()
+    def __init__(self):
+        self.buffer = ""
+        self.started = False
+        self.finished = False
+        self.expect_comma = False
+        self._decoder = json.JSONDecoder()
 
+    def feed(self, text: str) -> List[Any]:
+        buf = self.buffer + text
+        pos = 0
+        items = []
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos == len(buf):
+                break
+            char = buf[pos]
+            if self.finished:
+                raise ValueError(f"unexpected data after the JSON array: {buf[pos:pos + 20]!r}")
+            if not self.started:
+                if char != "[":
+                    raise ValueError(f"expected a JSON array, got {buf[pos:pos + 20]!r}")
+                self.started = True
+                pos += 1
+            elif char == "]":
+                self.finished = True
+                pos += 1
+            elif self.expect_comma:
+                if char != ",":
+                    raise ValueError(f"expected ',' in JSON array, got {buf[pos:pos + 20]!r}")
+                self.expect_comma = False
+                pos += 1
+            else:
+                try:
+                    item, end = self._decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    break  # incomplete element: wait for more text
+                if not isinstance(item, (dict, list, str)) and (
+                        not buf[end:].strip(" \t\r\n") or buf[end] not in ",] \t\r\n"):
+                    # A number (or literal) is only complete once a separator
+                    # follows: "-1." may still continue as "-1.5e10".
+                    break
+                items.append(item)
+                self.expect_comma = True
+                pos = end
+        self.buffer = buf[pos:]
+        return items
 
-def main():
-    check_platform()
+    def close(self):
+        if not self.finished or self.buffer.strip():
+            raise ValueError("truncated JSON array")
 
-    args = parse_args()
-    output_dir = Path(args.output_dir)
-    limit = args.limit if args.limit > 0 else DEFAULT_LIMIT * 100  # effectively unlimited
+class TranscriptWriter:
+    """
+    Renders a document while its transcript is still downloading, for
+    transcripts too large to hold in memory. The frontmatter and notes are
+    written to a temporary file first; transcript segments are then decoded
+    one at a time from the response body (JsonArrayStream) and appended as
+    they arrive. With a store, the segments are also streamed into it.
+    commit() moves the finished file into place exactly like
+    write_document, with the same result; an uncommitted writer leaves
+    nothing behind.
+    """
 
-    if not output_dir.exists():
+    def __init__(self, doc: Dict[str, Any], filepath: Path, overwrite: bool = False,
+                 store: Optional["PayloadStore"] = None):
+        self.doc = doc
+        self.filepath = filepath
+        self.overwrite = overwrite
+        self.store = store
+        self.tmp_path = filepath.with_name(f"{filepath.name}.{id(self):x}.tmp")
+        self.streamed = False
+        self.bytes_read = 0
+        self.segments = 0
+        self.content_hash = hashlib.sha256()  # of the Markdown written, as UTF-8
+        self._file = None
+        self._payload: Optional["PayloadWriter"] = None
+
+    def open(self):
+        self.streamed = True
+        people = extract_people(self.doc)
+        self._creator_name = people['creator']['name']
+        self._attendee_names = [a['name'] for a in people['attendees']]
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._array = JsonArrayStream()
+        self._file = open(self.tmp_path, 'w', encoding='utf-8')
+        self._write(render_document(self.doc, None))
+        if self.store is not None:
+            try:
+                self._payload = self.store.writer()
+            except OSError as e:
+                self._drop_payload(e)
+
+    def feed(self, chunk: bytes):
+        """Consumes the next chunk of the (decompressed) response body."""
+        self.bytes_read += len(chunk)
+        for segment in self._array.feed(self._text.decode(chunk)):
+            if self._payload is not None:
+                try:
+                    self._payload.add(segment)
+                except OSError as e:
+                    self._drop_payload(e)
+            if text := segment.get('text'):
+                # Same layout as format_transcript.
+                name = resolve_speaker_name(segment, self._creator_name, self._attendee_names)
+                self._write("\n\n---\n## Full Transcript\n\n" if not self.segments else "\n\n")
+                self._write(f"**{name}**: {text}")
+                self.segments += 1
+
+    def _write(self, text: str):
+        self._file.write(text)
+        self.content_hash.update(text.encode('utf-8'))
+
+    def commit(self) -> str:
+        self._array.feed(self._text.decode(b"", final=True))
+        self._array.close()
+        self._file.close()
+        if self._payload is not None:
+            try:
+                digest = self._payload.close()
+                self.store.record_digests(self.doc, self.store.put(self.doc), digest)
+            except OSError as e:
+                self._drop_payload(e)
+            self._payload = None
         try:
-            output_dir.mkdir(parents=True, exist_ok=True)
-            logger.info(f"Created output directory: {output_dir}")
+            if self.overwrite:
+                os.replace(self.tmp_path, self.filepath)
+                return WRITTEN
+            try:
+                # Like mode 'x' in write_document: the first writer of a filename wins.
+                os.link(self.tmp_path, self.filepath)
+            except FileExistsError:
+                logger.info(f"Skipping existing: {self.filepath.name}")
+                return TAKEN
+            return WRITTEN
         except OSError as e:
-            logger.critical(f"Could not create output directory: {e}")
-            return
-
-    token = load_access_token()
-    if not token:
-        return
+            logger.error(f"Failed to write {self.filepath.name}: {e}")
+            return FAILED
+        finally:
+            self.discard()
 
-    logger.info("Fetching document list...")
-    documents = fetch_documents(token, limit=limit)
-    logger.info(f"Found {len(documents)} documents.")
+    def _drop_payload(self, error: OSError):
+        logger.warning(f"Failed to store payloads for {self.doc.get('id')}: {error}")
+        if self._payload is not None:
+            self._payload.discard()
+            self._payload = None
 
-    success_count = 0
-    for doc in documents:
+    def discard(self):
+        if self._file is not None:
+            self._file.close()
+        if self._payload is not None:
+            self._payload.discard()
+            self._payload = None
         try:
-            if sync_document(doc, token, output_dir):
-                success_count += 1
-        except (KeyError, ValueError, TypeError, OSError) as e:
-            logger.error(f"Error processing doc '{doc.get('title')}': {e}")
-            continue
+            os.unlink(self.tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "TranscriptWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.discard()
+
+# What write_document and TranscriptWriter.commit did with the file.
+WRITTEN = "written"  # created or replaced it
+TAKEN = "taken"      # left alone: a new document's filename already existed
+FAILED = "failed"
+
+def write_document(filepath: Path, full_content: str, overwrite: bool = False) -> str:
+    # --- 5. Save ---
+    # Exclusive create: with --workers, two documents can map to the same
+    # filename; the first writer wins, exactly like the serial exists() check.
+    # Updates of changed documents replace the file atomically instead.
+    try:
+        if overwrite:
+            tmp_path = filepath.with_name(filepath.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(full_content)
+            os.replace(tmp_path, filepath)
+            return WRITTEN
+        with open(filepath, 'x', encoding='utf-8') as f:
+            f.write(full_content)
+        return WRITTEN
+    except FileExistsError:
+        logger.info(f"Skipping existing: {filepath.name}")
+        return TAKEN
+    except IOError as e:
+        logger.error(f"Failed to write {filepath.name}: {e}")
+        return FAILED
+
+def check_document(doc: Dict[str, Any], filepath: Path, overwrite: bool,
+                   manifest: Optional["SyncManifest"]) -> Tuple[Optional[Path], bool, Optional[Path]]:
+    """
+    Decides how sync_document handles a document: returns (the file to
+    write, whether to replace it, the file it was written to before), with
+    no file to write when it is skipped because its filename is taken.
+    Without a manifest, an existing file means taken; with one, its record
+    of which document owns which file decides, without a stat. A document
+    is only ever replaced in a file it owns: if its new name (after a
+    title or date change) is taken, it keeps the old one.
+    """
+    if manifest is None:
+        return (None if not overwrite and filepath.exists() else filepath), overwrite, None
+    doc_id = doc["id"]
+    previous = manifest.file_of(doc_id)
+    if previous is not None and manifest.taken(previous, doc_id):
+        previous = None  # shared with another document's row; not this one's to replace
+    if previous is None:
+        return (None if manifest.taken(filepath, doc_id) else filepath), False, None
+    if previous == filepath or manifest.taken(filepath, doc_id) or filepath.exists():
+        return previous, True, previous
+    return filepath, False, previous
+
+def save_document(doc: Dict[str, Any], filepath: Path, full_content: str, overwrite: bool,
+                  manifest: Optional["SyncManifest"], previous: Optional[Path]) -> bool:
+    """write_document, then the manifest update (see SyncManifest.record_file) if the file was written."""
+    result = write_document(filepath, full_content, overwrite)
+    if result == WRITTEN and manifest is not None:
+        manifest.record_file(doc, filepath, hashlib.sha256(full_content.encode('utf-8')).hexdigest(), previous)
+    return result != FAILED
+
+def commit_document(writer: TranscriptWriter, manifest: Optional["SyncManifest"], previous: Optional[Path]) -> bool:
+    """TranscriptWriter.commit, then the manifest update (see SyncManifest.record_file) if the file was written."""
+    result = writer.commit()
+    if result == WRITTEN and manifest is not None:
+        manifest.record_file(writer.doc, writer.filepath, writer.content_hash.hexdigest(), previous)
+    return result != FAILED
+
+def sync_document(doc: Dict[str, Any], client: GranolaClient, output_dir: Path, overwrite: bool = False,
+                  store: Optional["PayloadStore"] = None, manifest: Optional["SyncManifest"] = None) -> bool:
+    """
+    Writes one document to the vault. Existing files are skipped unless
+    `overwrite` is set, which is how changed documents are re-rendered.
+    With a manifest, a document it has a file for is updated instead (and
+    the old file removed if the name changed), and a new one is only
+    skipped when another document's file has its name (see check_document).
+    With a store, the raw document and transcript payloads are kept too.
+    Large transcripts are rendered straight to the file as they download.
+    """
+    doc_id = doc.get("id")
+    title = doc.get("title", "Untitled")
+
+    if not doc_id:
+        return False
+
+    filepath = document_path(doc, output_dir)
+    if filepath is None:
+        return False
+
+    # --- CHECK IF EXISTS ---
+    target, overwrite, previous = check_document(doc, filepath, overwrite, manifest)
+    if target is None:
+        logger.info(f"Skipping existing: {filepath.name}")
+        return True
+    filepath = target
+    logger.info(f"Updating changed: {title}" if previous is not None or overwrite else f"Downloading new: {title}")
+
+    with TranscriptWriter(doc, filepath, overwrite, store) as writer:
+        try:
+            transcript_data = fetch_transcript(client, doc_id, writer)
+        except requests.RequestException:
+            # Don't write a transcript-less file; the next run will pick it up again.
+            return False
+        if writer.streamed:
+            return commit_document(writer, manifest, previous)
+
+    if store is not None:
+        store.record(doc, transcript_data)
+    return save_document(doc, filepath, render_document(doc, transcript_data), overwrite, manifest, previous)
+
+# --- Payload Store ---
+
+class PayloadStore:
+    """
+    Content-addressed store of the raw API payloads every file was rendered
+    from. Objects are canonical JSON, gzip-compressed, named by their SHA-256
+    (objects/ab/cdef....json.gz), so identical payloads are stored once;
+    index.json maps each document ID to its latest document and transcript
+    objects. `rebuild` regenerates the vault from it without the network.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.index_path = directory / "index.json"
+        self.index: Dict[str, Dict[str, Optional[str]]] = {}
+        self.objects_written = 0
+        self._lock = threading.Lock()
+        (directory / "objects").mkdir(parents=True, exist_ok=True)
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, 'rb') as f:
+                    self.index = json_loads(f.read())
+            except (json.JSONDecodeError, OSError) as e:
+                logger.warning(f"Ignoring unreadable payload index {self.index_path}: {e}")
+
+    def _object_path(self, digest: str) -> Path:
+        return self.directory / "objects" / digest[:2] / f"{digest[2:]}.json.gz"
+
+    def put(self, payload: Any) -> str:
+        data = json_dumps(payload, sort_keys=True)
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if path.exists():
+            return digest
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(path.name + f".{threading.get_ident()}.tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(gzip.compress(data, mtime=0))
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.objects_written += 1
+        return digest
+
+    def get(self, digest: str) -> Any:
+        with open(self._object_path(digest), 'rb') as f:
+            return json_loads(gzip.decompress(f.read()))
+
+    def writer(self) -> "PayloadWriter":
+        return PayloadWriter(self)
+
+    def record(self, doc: Dict[str, Any], transcript_data: Optional[List[Dict[str, Any]]]):
+        """Stores both payloads of a document; a missing transcript (404) is recorded as None."""
+        try:
+            document = self.put(doc)
+            transcript = self.put(transcript_data) if transcript_data is not None else None
+        except OSError as e:
+            logger.warning(f"Failed to store payloads for {doc.get('id')}: {e}")
+            return
+        self.record_digests(doc, document, transcript)
+
+    def record_digests(self, doc: Dict[str, Any], document: str, transcript: Optional[str]):
+        with self._lock:
+            self.index[doc["id"]] = {'document': document, 'transcript': transcript}
+
+    def save(self):
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            with self._lock:
+                data = json_dumps(self.index, sort_keys=True, indent=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.error(f"Failed to save payload index {self.index_path}: {e}")
+
+    def log_stats(self):
+        logger.info(f"Payload store: {len(self.index)} documents, {self.objects_written} new objects")
+
+class PayloadWriter:
+    """
+    Streams a JSON array into a PayloadStore one element at a time, producing
+    byte-for-byte the object put() would store for the whole list.
+    """
+
+    def __init__(self, store: PayloadStore):
+        self.store = store
+        self.count = 0
+        self._hash = hashlib.sha256()
+        self._tmp_path = store.directory / "objects" / f"incoming.{threading.get_ident()}.{id(self)}.tmp"
+        self._raw = open(self._tmp_path, 'wb')
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode='wb', mtime=0)
+
+    def _write(self, data: bytes):
+        self._hash.update(data)
+        self._gzip.write(data)
+
+    def add(self, item: Any):
+        self._write((b"," if self.count else b"[") + json_dumps(item, sort_keys=True))
+        self.count += 1
+
+    def close(self) -> str:
+        self._write(b"]" if self.count else b"[]")
+        self._gzip.close()
+        self._raw.close()
+        digest = self._hash.hexdigest()
+        path = self.store._object_path(digest)
+        if path.exists():
+            os.unlink(self._tmp_path)
+            return digest
+        path.parent.mkdir(exist_ok=True)
+        os.replace(self._tmp_path, path)
+        with self.store._lock:
+            self.store.objects_written += 1
+        return digest
+
+    def discard(self):
+        self._gzip.close()
+        self._raw.close()
+        try:
+            os.unlink(self._tmp_path)
+        except FileNotFoundError:
+            pass
+
+def rebuild_vault(store: PayloadStore, output_dir: Path, manifest: "SyncManifest") -> "SyncReport":
+    """
+    Re-renders every stored document into the vault, with zero network calls.
+    Each document goes to the file the manifest records for it, so when two
+    meetings share a filename the one the sync kept keeps it. The others
+    are handed out newest first, as the listing does, and recorded.
+    """
+    report = SyncReport()
+    written = set()
+
+    def created_at(doc_id: str) -> str:
+        entry = manifest.get(doc_id)
+        if entry is not None and entry['created_at']:
+            return entry['created_at']
+        try:
+            return store.get(store.index[doc_id]['document']).get('created_at') or ''
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return ''
+
+    for doc_id in sorted(store.index, key=created_at, reverse=True):
+        entry = store.index[doc_id]
+        try:
+            doc = store.get(entry['document'])
+            transcript_data = store.get(entry['transcript']) if entry.get('transcript') else None
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.error(f"Missing or corrupt payload for {doc_id}: {e}")
+            report.record({'id': doc_id}, False)
+            continue
+
+        filepath = manifest.file_of(doc_id) or document_path(doc, output_dir)
+        if filepath is None:
+            report.record(doc, False)
+            continue
+        if filepath in written or manifest.taken(filepath, doc_id):
+            # Same first-writer-wins rule as a sync for colliding filenames.
+            logger.info(f"Skipping existing: {filepath.name}")
+            report.record(doc, True)
+            continue
+        written.add(filepath)
+        report.record(doc, save_document(doc, filepath, render_document(doc, transcript_data), overwrite=True,
+                                         manifest=manifest, previous=None))
+    return report
+
+# --- Sync State ---
+
+def scan_synced_files(output_dir: Path) -> Dict[str, Path]:
+    """Maps the granola_id in the frontmatter of Markdown files already in the vault to their paths."""
+    files = {}
+    for path in output_dir.glob("*/*.md"):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if f.readline().strip() != "---":
+                    continue
+                for line in f:
+                    if line.startswith("granola_id:"):
+                        files.setdefault(line.split(":", 1)[1].strip(), path)
+                        break
+                    if line.strip() == "---":
+                        break
+        except (OSError, UnicodeDecodeError):
+            continue
+    return files
+
+class SyncManifest:
+    """
+    SQLite database (WAL mode) in the output directory with one row per
+    document, keyed by granola_id: the file it was written to (relative to
+    the output directory), the SHA-256 of its document payload (the same
+    digest PayloadStore files it under) and of the Markdown written, its
+    remote created_at/updated_at and its sync status ('synced' or
+    'failed'). Whether a listed document is current, and where its file
+    is, are single primary-key lookups; the file can also be queried
+    directly, e.g. with the sqlite3 shell.
+
+    A row with a NULL path is known but has no file of its own (adopted
+    from an older state file, or its filename was taken by another
+    document). Rows are committed as they are written, so a run that
+    dies keeps everything it finished. Safe to use from worker threads.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            granola_id TEXT PRIMARY KEY,
+            path TEXT,
+            title TEXT,
+            created_at TEXT,
+            updated_at TEXT,
+            document_sha256 TEXT,
+            content_sha256 TEXT,
+            status TEXT NOT NULL DEFAULT 'synced',
+            synced_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS documents_path ON documents (path);
+    """
+
+    def __init__(self, path: Path, output_dir: Path):
+        self.path = path
+        self.output_dir = output_dir
+        self.renamed = 0
+        self._lock = threading.RLock()  # record_file holds it across its lookups and update
+        try:
+            self._db = self._open(str(path))
+        except sqlite3.Error as e:
+            logger.warning(f"Sync manifest {path} unusable ({e}); keeping it in memory for this run.")
+            self._db = self._open(":memory:")
+
+    @staticmethod
+    def _open(database: str) -> sqlite3.Connection:
+        db = sqlite3.connect(database, isolation_level=None, check_same_thread=False)
+        try:
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")  # WAL stays consistent; only the last commits can be lost
+            db.executescript(SyncManifest.SCHEMA)
+        except sqlite3.Error:
+            db.close()
+            raise
+        return db
+
+    def _execute(self, sql: str, params: Iterable[Any] = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._db.execute(sql, tuple(params)).fetchall()
+
+    def __len__(self) -> int:
+        return self._execute("SELECT COUNT(*) FROM documents")[0][0]
+
+    def get(self, doc_id: str) -> Optional[sqlite3.Row]:
+        rows = self._execute("SELECT * FROM documents WHERE granola_id = ?", (doc_id,))
+        return rows[0] if rows else None
+
+    def relative(self, filepath: Path) -> str:
+        return filepath.relative_to(self.output_dir).as_posix()
+
+    def file_of(self, doc_id: str) -> Optional[Path]:
+        """The file the document was last written to, if any."""
+        entry = self.get(doc_id)
+        return self.output_dir / entry['path'] if entry is not None and entry['path'] else None
+
+    def taken(self, filepath: Path, doc_id: str) -> bool:
+        """True when another document was written to `filepath`."""
+        return bool(self._execute("SELECT 1 FROM documents WHERE path = ? AND granola_id != ? LIMIT 1",
+                                  (self.relative(filepath), doc_id)))
+
+    def adopt(self, documents: Dict[str, Optional[str]], files: Dict[str, Path]):
+        """Seeds an empty manifest from an older state file's {id: updated_at} and the vault's files."""
+        rows = [(doc_id, self.relative(files[doc_id]) if doc_id in files else None, documents.get(doc_id))
+                for doc_id in set(documents) | set(files)]
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany("INSERT OR IGNORE INTO documents (granola_id, path, updated_at) VALUES (?, ?, ?)",
+                                 rows)
+            self._db.execute("COMMIT")
+
+    def record_file(self, doc: Dict[str, Any], filepath: Path, content_sha256: str,
+                    previous: Optional[Path] = None) -> bool:
+        """
+        Records the file a document just created or replaced and the hashes
+        of what was written. Its `previous` file, if the name changed (a new
+        title or date), is removed unless another document has it. Ownership
+        is checked again here, atomically with the update: a file another
+        document has since been recorded for is not claimed (returns False).
+        """
+        doc_id = doc["id"]
+        document_sha256 = hashlib.sha256(json_dumps(doc, sort_keys=True)).hexdigest()
+        with self._lock:
+            if self.taken(filepath, doc_id):
+                logger.warning(f"{filepath.name} is recorded for another document; not recording it for {doc_id}")
+                return False
+            if previous is not None and previous != filepath:
+                self.retire(previous, filepath, doc_id)
+            self._execute(
+                "INSERT INTO documents (granola_id, path, title, created_at, document_sha256, content_sha256) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (granola_id) DO UPDATE SET path = excluded.path, "
+                "title = excluded.title, created_at = excluded.created_at, "
+                "document_sha256 = excluded.document_sha256, content_sha256 = excluded.content_sha256",
+                (doc_id, self.relative(filepath), doc.get("title"), doc.get("created_at"),
+                 document_sha256, content_sha256))
+        return True
+
+    def record_status(self, doc: Dict[str, Any], ok: bool):
+        """A synced document is current as of its updated_at; a failed one keeps the last it was synced at."""
+        now = datetime.now(timezone.utc).isoformat()
+        if ok:
+            self._execute(
+                "INSERT INTO documents (granola_id, title, created_at, updated_at, status, synced_at) "
+                "VALUES (?, ?, ?, ?, 'synced', ?) ON CONFLICT (granola_id) DO UPDATE SET "
+                "updated_at = excluded.updated_at, status = 'synced', synced_at = excluded.synced_at",
+                (doc["id"], doc.get("title"), doc.get("created_at"), doc.get("updated_at"), now))
+        else:
+            self._execute(
+                "INSERT INTO documents (granola_id, title, created_at, status) VALUES (?, ?, ?, 'failed') "
+                "ON CONFLICT (granola_id) DO UPDATE SET status = 'failed'",
+                (doc["id"], doc.get("title"), doc.get("created_at")))
+
+    def failed_ids(self) -> List[str]:
+        """Documents whose last sync failed, most recently created first."""
+        return [row[0] for row in self._execute(
+            "SELECT granola_id FROM documents WHERE status = 'failed' ORDER BY created_at DESC")]
+
+    def set_updated_at(self, doc_id: str, updated_at: Optional[str]):
+        self._execute("UPDATE documents SET updated_at = ? WHERE granola_id = ?", (updated_at, doc_id))
+
+    def retire(self, previous: Path, filepath: Path, doc_id: str):
+        if self.taken(previous, doc_id):
+            return
+        try:
+            previous.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove {previous.name} after renaming it to {filepath.name}: {e}")
+            return
+        logger.info(f"Renamed: {previous.name} -> {filepath.name}")
+        with self._lock:
+            self.renamed += 1
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def log_stats(self):
+        counts = dict(self._execute("SELECT status, COUNT(*) FROM documents GROUP BY status"))
+        logger.info(f"Manifest: {sum(counts.values())} documents ({counts.get('synced', 0)} synced, "
+                    f"{counts.get('failed', 0)} failed), {self.renamed} files renamed")
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def is_newer(value: Optional[str], than: Optional[str]) -> bool:
+    """Compares two API timestamps; anything is newer than a missing one."""
+    if not than:
+        return True
+    if not value:
+        return False
+    a, b = parse_timestamp(value), parse_timestamp(than)
+    if a is None or b is None:
+        return value > than
+    return a > b
+
+class SyncState:
+    """
+    JSON file in the output directory with what the next run needs besides
+    the SyncManifest: the high-water mark (moved only after a complete,
+    failure-free listing), whether the run was interrupted, and the
+    backlog a budget-stopped run left (see Backlog).
+    """
+
+    def __init__(self, path: Path, manifest: SyncManifest):
+        self.path = path
+        self.manifest = manifest
+        self.high_water_mark: Optional[str] = None
+        self._run_max: Optional[str] = None
+        self.stopped_early = False
+        self.interrupted = False
+        self.page_size: Optional[int] = None  # where PageSizer settled last run
+        self.pending: List[str] = []
+        self.resume_offset: Optional[int] = None
+
+    @classmethod
+    def load(cls, output_dir: Path) -> "SyncState":
+        state = cls(output_dir / STATE_FILENAME, SyncManifest(output_dir / MANIFEST_FILENAME, output_dir))
+        data = {}
+        if state.path.exists():
+            try:
+                with open(state.path, 'rb') as f:
+                    data = json_loads(f.read())
+                state.high_water_mark = data.get('high_water_mark')
+                state.interrupted = bool(data.get('interrupted', False))
+                state.page_size = data.get('page_size')
+                state.pending = [doc_id for doc_id in data.get('pending', []) if isinstance(doc_id, str)]
+                resume_offset = data.get('resume_offset')
+                state.resume_offset = resume_offset if isinstance(resume_offset, int) else None
+            except (json.JSONDecodeError, OSError, AttributeError, TypeError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable sync state {state.path}: {e}")
+                data = {}
+        if not len(state.manifest):
+            # First run with a manifest: adopt the documents recorded by an older
+            # state file, and whatever is already in the vault.
+            documents = data.get('documents')
+            state.manifest.adopt(documents if isinstance(documents, dict) else {}, scan_synced_files(output_dir))
+        return state
+
+    def observe(self, doc: Dict[str, Any]):
+        """Tracks the newest updated_at listed in this run."""
+        updated_at = doc.get("updated_at")
+        if updated_at and is_newer(updated_at, self._run_max):
+            self._run_max = updated_at
+
+    def is_current(self, doc: Dict[str, Any]) -> bool:
+        """True when the document was synced before and hasn't changed since."""
+        doc_id = doc.get("id")
+        entry = self.manifest.get(doc_id) if doc_id else None
+        if entry is None or entry['status'] != 'synced':
+            return False
+        updated_at = doc.get("updated_at")
+        if not updated_at or not is_newer(updated_at, self.high_water_mark):
+            return True
+        synced_at = entry['updated_at']
+        if synced_at is None:
+            # Adopted from an existing file: assume it is current from now on.
+            self.manifest.set_updated_at(doc_id, updated_at)
+            return True
+        return not is_newer(updated_at, synced_at)
+
+    def record(self, doc: Dict[str, Any], ok: bool):
+        if doc.get("id"):
+            self.manifest.record_status(doc, ok)
+
+    def backlog_ids(self) -> List[str]:
+        """
+        The documents the next run has to fetch by ID: those left pending at
+        the run budget, then those that failed. An incremental listing
+        stops at the first synced ones and would never reach older failures.
+        """
+        return list(dict.fromkeys(self.pending + self.manifest.failed_ids()))
+
+    def advance(self):
+        """Moves the high-water mark up; only call after an exhaustive, fully successful run."""
+        if self._run_max and is_newer(self._run_max, self.high_water_mark):
+            self.high_water_mark = self._run_max
+
+    def save(self):
+        data = {'high_water_mark': self.high_water_mark, 'interrupted': self.interrupted,
+                'page_size': self.page_size, 'pending': self.pending, 'resume_offset': self.resume_offset}
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(json_dumps(data, sort_keys=True, indent=True))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Failed to save sync state {self.path}: {e}")
+
+def skip_current(documents: Iterator[Dict[str, Any]], state: SyncState, stop_after: Optional[int],
+                 report: "SyncReport") -> Iterator[Dict[str, Any]]:
+    """
+    Drops documents that were synced before and haven't changed since. In
+    incremental mode (stop_after set), relies on the API's newest-first order
+    and stops paginating once `stop_after` of them appear in a row.
+    """
+    streak = 0
+    try:
+        for doc in documents:
+            state.observe(doc)
+            if not state.is_current(doc):
+                streak = 0
+                yield doc
+                continue
+            report.skipped += 1
+            streak += 1
+            if stop_after and streak >= stop_after:
+                logger.info(f"Reached {streak} already-synced documents in a row; stopping the listing.")
+                state.stopped_early = True
+                return
+    finally:
+        documents.close()
+
+class RecencyQueue:
+    """
+    Bounded reorder buffer between the listing and the sync. It holds up to
+    `window` listed documents and always releases the most recently created
+    one, so new meetings are fetched and written before older backfill even
+    when the listing delivers them late (recovered after drift, batched
+    panel fetches). A window of 0 or 1 keeps listing order. With a sizer,
+    the window is capped at the current page size, so the queue never
+    holds more documents than one page (heavy meetings shrink both) and
+    syncing starts as soon as the first page is listed.
+    """
+
+    def __init__(self, window: int = DEFAULT_PRIORITY_WINDOW, sizer: Optional["PageSizer"] = None):
+        self.window = max(window, 1)
+        self.sizer = sizer
+        self.deferred = 0  # documents released after one that was listed later
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []
+        self._seq = 0
+        self._released = -1
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, doc: Dict[str, Any]):
+        created = parse_timestamp(doc.get("created_at"))
+        # Undated documents go last; ties keep listing order.
+        key = -created.timestamp() if created else float("inf")
+        heapq.heappush(self._heap, (key, self._seq, doc))
+        self._seq += 1
+
+    def full(self) -> bool:
+        window = min(self.window, self.sizer.size) if self.sizer is not None else self.window
+        return len(self._heap) >= window
+
+    def pop(self) -> Dict[str, Any]:
+        _, seq, doc = heapq.heappop(self._heap)
+        if seq < self._released:
+            self.deferred += 1
+        self._released = max(self._released, seq)
+        return doc
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Removes and returns the held documents, most recent first."""
+        docs = [doc for *_, doc in sorted(self._heap)]
+        self._heap.clear()
+        return docs
+
+    def log_stats(self):
+        if self.deferred:
+            logger.info(f"Scheduling: {self.deferred} older documents deferred behind more recent ones")
+
+def newest_first(documents: Iterator[Dict[str, Any]], queue: RecencyQueue,
+                 budget: Optional[RunBudget] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Passes documents through `queue`, most recently created first. Once
+    `budget` is spent, stops listing and releasing; what is still held
+    stays in the queue.
+    """
+    budget = budget or RunBudget()
+    try:
+        for doc in documents:
+            queue.push(doc)
+            if budget.exhausted:
+                return
+            if queue.full():
+                yield queue.pop()
+    except requests.RequestException:
+        while queue:  # the listing failed: still sync what it delivered
+            yield queue.pop()
+        raise
+    finally:
+        documents.close()
+    while queue and not budget.exhausted:
+        yield queue.pop()
+
+class Backlog:
+    """
+    The run's listing when an earlier run stopped at its budget (see
+    RunBudget) before getting through the account, or failed to sync some
+    documents. New meetings at the top come first, listed incrementally;
+    then the documents earlier runs had listed but not synced (see
+    SyncState.backlog_ids), fetched by ID; then the rest of the listing
+    from the offset the stopped run had reached. If this run stops as well, leftovers
+    not yet handed out stay in `pending` and cursor() says where to resume.
+    """
+
+    def __init__(self, pending: Iterable[str] = (), resume_offset: Optional[int] = None):
+        self.pending = deque(pending)
+        self.resume_offset = resume_offset
+        self.stage = "top"
+        self.finished = False  # the listing got to the end of the account
+        self.looked_at: Set[str] = set()  # documents the top pass got to
+
+    @property
+    def resuming(self) -> bool:
+        return bool(self.pending) or self.resume_offset is not None
+
+    def cursor(self, stitcher: PageStitcher) -> Optional[int]:
+        """The listing offset the next run should resume from if this one stops now."""
+        if self.finished:
+            return None
+        if self.stage == "pending":
+            return self.resume_offset
+        if self.stage == "top" and self.resume_offset is not None:
+            # Stopped among new meetings: resume below them and list through the old backlog on the way.
+            return min(stitcher.position, self.resume_offset)
+        return stitcher.position
+
+    def save(self, state: "SyncState", queue: RecencyQueue, stitcher: PageStitcher, budget: RunBudget,
+             listed: bool, exhaustive: bool):
+        """Records in `state` what the next run has to pick up."""
+        if budget.exhausted:
+            state.stopped_early = True
+        if not exhaustive:
+            # A limited run neither resumes nor replaces the backlog; if cut short, the next run lists everything.
+            state.interrupted = not listed or budget.exhausted
+            return
+        state.interrupted = not listed
+        if budget.exhausted and listed:
+            leftovers = [doc.get("id") for doc in queue.drain()] + list(self.pending)
+            state.pending = [doc_id for doc_id in dict.fromkeys(leftovers) if doc_id]
+            state.resume_offset = self.cursor(stitcher)
+            logger.warning(
+                f"Stopped at the run budget: {len(state.pending)} listed documents left for the next run"
+                + (f", which resumes the listing at offset {state.resume_offset}." if state.resume_offset is not None
+                   else ".")
+            )
+        elif listed:
+            state.pending, state.resume_offset = [], None
+
+    def _track(self, documents: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        try:
+            for doc in documents:
+                self.looked_at.add(doc.get("id"))
+                yield doc
+        finally:
+            documents.close()
+
+    async def _track_async(self, documents: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            async for doc in documents:
+                self.looked_at.add(doc.get("id"))
+                yield doc
+        finally:
+            await documents.aclose()
+
+    def _resume(self, stitcher: PageStitcher):
+        logger.info(f"Resuming the previous run: {len(self.pending)} pending or failed documents"
+                    + (f", then the listing from offset {self.resume_offset}."
+                       if self.resume_offset is not None else "."))
+        # The top pass stopped partway through a page; the rest of that page
+        # was never looked at, so it must not count as seen.
+        stitcher.seen &= self.looked_at
+        self.stage = "pending"
+
+    def _next_batch(self, stitcher: PageStitcher) -> List[str]:
+        ids = []
+        while self.pending and len(ids) < PANEL_BATCH_SIZE:
+            doc_id = self.pending.popleft()
+            if doc_id not in stitcher.seen:
+                ids.append(doc_id)
+        return ids
+
+    def _hand_out(self, docs: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        handed = 0
+        try:
+            for doc in docs:
+                handed += 1
+                yield doc
+        finally:
+            # Stopped partway: the rest of the batch stays pending.
+            self.pending.extendleft(reversed([doc["id"] for doc in docs[handed:]]))
+
+    def _iter_pending(self, client: GranolaClient, stitcher: PageStitcher) -> Iterator[Dict[str, Any]]:
+        while self.pending:
+            ids = self._next_batch(stitcher)
+            if not ids:
+                continue
+            try:
+                docs = fetch_documents_batch(client, ids)
+            except requests.RequestException:
+                self.pending.extendleft(reversed(ids))
+                raise
+            yield from self._hand_out(stitcher.admit(docs))
+
+    def iter(self, client: GranolaClient, state: "SyncState", report: "SyncReport", stop_after: Optional[int],
+             limit: int, prefetch: int, include_panels: bool, stitcher: PageStitcher,
+             sizer: PageSizer) -> Iterator[Dict[str, Any]]:
+        """Lists documents that aren't current (see skip_current), newest first, then the backlog."""
+        self.stage = "top"
+        top = self._track(iter_documents(client, limit, prefetch, include_panels, stitcher, sizer))
+        yield from skip_current(top, state, stop_after, report)
+        if self.resuming and state.stopped_early:
+            self._resume(stitcher)
+            yield from skip_current(self._iter_pending(client, stitcher), state, None, report)
+            if self.resume_offset is not None:
+                self.stage = "rest"
+                yield from skip_current(iter_documents(client, limit, prefetch, include_panels, stitcher, sizer,
+                                                       start=self.resume_offset), state, None, report)
+        self.finished = True
+
+    async def _iter_pending_async(self, client: "AsyncGranolaClient",
+                                  stitcher: PageStitcher) -> AsyncIterator[Dict[str, Any]]:
+        while self.pending:
+            ids = self._next_batch(stitcher)
+            if not ids:
+                continue
+            try:
+                docs = await fetch_documents_batch_async(client, ids)
+            except ASYNC_API_ERRORS:
+                self.pending.extendleft(reversed(ids))
+                raise
+            batch = self._hand_out(stitcher.admit(docs))
+            try:
+                for doc in batch:
+                    yield doc
+            finally:
+                batch.close()
+
+    async def iter_async(self, client: "AsyncGranolaClient", state: "SyncState", report: "SyncReport",
+                         stop_after: Optional[int], limit: int, prefetch: int, include_panels: bool,
+                         stitcher: PageStitcher, sizer: PageSizer) -> AsyncIterator[Dict[str, Any]]:
+        self.stage = "top"
+        top = self._track_async(iter_documents_async(client, limit, prefetch, include_panels, stitcher, sizer))
+        async for doc in skip_current_async(top, state, stop_after, report):
+            yield doc
+        if self.resuming and state.stopped_early:
+            self._resume(stitcher)
+            async for doc in skip_current_async(self._iter_pending_async(client, stitcher), state, None, report):
+                yield doc
+            if self.resume_offset is not None:
+                self.stage = "rest"
+                async for doc in skip_current_async(iter_documents_async(client, limit, prefetch, include_panels,
+                                                                         stitcher, sizer, start=self.resume_offset),
+                                                    state, None, report):
+                    yield doc
+        self.finished = True
+
+# --- Async Engine ---
+# Same pipeline as fetch_documents/fetch_transcript/sync_document, but on one
+# event loop with an httpx.AsyncClient, so many transcript requests can be in
+# flight without one OS thread each. Rendering is shared with the sync engine.
+
+# What the async engine treats as a failed API call: httpx errors, or a refused request.
+ASYNC_API_ERRORS = (httpx.HTTPError, CircuitOpenError) if httpx is not None else (CircuitOpenError,)
+
+class AsyncGranolaClient:
+    """
+    asyncio counterpart of GranolaClient, backed by httpx.AsyncClient. With
+    `http2`, every in-flight request is a stream multiplexed over a single
+    connection instead of occupying a pooled HTTP/1.1 connection of its own.
+    """
+
+    def __init__(self, token: Union[str, TokenProvider], concurrency: int = DEFAULT_ASYNC_CONCURRENCY,
+                 limiter: Optional[RateLimiter] = None, retry: Optional[RetryPolicy] = None,
+                 cache: Optional[HttpCache] = None, breaker: Optional[CircuitBreaker] = None,
+                 http2: bool = False, base_url: Optional[str] = None, budget: Optional[RunBudget] = None):
+        self.tokens = token if isinstance(token, TokenProvider) else TokenProvider(token)
+        self.budget = budget or RunBudget()
+        self.limiter = limiter or RateLimiter()
+        self.retry = retry or RetryPolicy()
+        self.cache = cache
+        self.breaker = breaker or CircuitBreaker()
+        self.requests_sent = 0
+        self.first_request: Optional[float] = None
+        self.versions = Counter()
+        self.transfer = TransferStats()
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        connect_timeout, read_timeout = REQUEST_TIMEOUT
+        # httpx only decodes br/zstd when brotli/zstandard are installed.
+        encodings = getattr(getattr(httpx, "_decoders", None), "SUPPORTED_DECODERS", ("gzip", "deflate"))
+        base_url = base_url or API_BASE_URL
+        # Over https HTTP/2 is negotiated with ALPN, falling back to HTTP/1.1; a plain-http
+        # server (e.g. a local benchmark) can only be spoken to with prior knowledge.
+        self.http = httpx.AsyncClient(base_url=base_url, headers=get_headers(self.tokens.token, encodings), limits=limits,
+                                      timeout=httpx.Timeout(read_timeout, connect=connect_timeout), http2=http2,
+                                      http1=not (http2 and base_url.startswith("http://")))
+
+    async def post(self, endpoint: str, payload: Dict[str, Any],
+                   headers: Optional[Dict[str, str]] = None, stream: bool = False) -> "httpx.Response":
+        retries = throttles = 0
+        reauthorized = False
+        while True:
+            wait = self.breaker.reserve()
+            while wait:
+                await asyncio.sleep(wait)
+                wait = self.breaker.reserve()
+            if wait is None:
+                raise CircuitOpenError(f"circuit breaker open, not sending {endpoint}")
+            reserved = time.monotonic()
+            wait = self.limiter.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.requests_sent += 1
+            self.budget.spend()
+            if self.first_request is None:
+                self.first_request = time.monotonic()
+            token = self.tokens.current()
+            try:
+                request = self.http.build_request("POST", endpoint, json=payload,
+                                                  headers={**(headers or {}), "Authorization": f"Bearer {token}"})
+                response = await self.http.send(request, stream=True)
+                self.versions[response.http_version] += 1
+                if not (stream and response.status_code == 200 and is_large_body(response.headers)):
+                    try:
+                        await response.aread()
+                    finally:
+                        await response.aclose()
+                    self.transfer.add(endpoint, response.num_bytes_downloaded, len(response.content))
+            except httpx.TransportError as e:
+                self.breaker.record(ok=False)
+                if retries >= self.retry.max_retries:
+                    raise
+                failure = str(e) or type(e).__name__
+            else:
+                self.breaker.record(ok=not self.retry.should_retry(response.status_code))
+                self.limiter.on_response(response.status_code, response.headers.get("Retry-After"), reserved)
+                if response.status_code == 429 and throttles < MAX_THROTTLE_RETRIES:
+                    throttles += 1
+                    logger.warning(f"Throttled (429) on {endpoint}; slowing down to {self.limiter.rate:.1f} req/s")
+                    continue
+                if response.status_code == 401 and not reauthorized:
+                    reauthorized = True
+                    # refresh() may wait on the credentials file; keep the event loop free meanwhile.
+                    if await asyncio.get_running_loop().run_in_executor(None, self.tokens.refresh, token):
+                        continue
+                if not self.retry.should_retry(response.status_code) or retries >= self.retry.max_retries:
+                    return response
+                failure = f"HTTP {response.status_code}"
+
+            retries += 1
+            delay = self.retry.next_delay(endpoint, retries)
+            logger.warning(f"{endpoint} failed ({failure}); retry {retries}/{self.retry.max_retries} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def log_stats(self):
+        versions = ", ".join(f"{count} over {version}" for version, count in self.versions.most_common())
+        logger.info(f"HTTP: {self.requests_sent} requests ({versions or 'none answered'})")
+        self.transfer.log_stats()
+
+    async def __aenter__(self) -> "AsyncGranolaClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.http.aclose()
+
+def response_json_async(response: "httpx.Response", content: Optional[bytes] = None) -> Any:
+    """response_json for httpx: a body that isn't JSON raises httpx.DecodingError."""
+    try:
+        return json_loads(response.content if content is None else content)
+    except ValueError as e:
+        raise httpx.DecodingError(f"Invalid JSON from {response.url}: {e}", request=response.request)
+
+def documents_of_async(response: "httpx.Response") -> List[Dict[str, Any]]:
+    """documents_of for httpx: a malformed body raises httpx.DecodingError."""
+    try:
+        return response_docs(response_json_async(response), str(response.url))
+    except ValueError as e:
+        raise httpx.DecodingError(str(e), request=response.request)
+
+async def fetch_document_page_async(client: AsyncGranolaClient, offset: int, page_size: int,
+                                    include_panels: bool = True,
+                                    sizer: Optional["PageSizer"] = None) -> List[Dict[str, Any]]:
+    payload = {
+        "limit": page_size,
+        "offset": offset,
+        "include_last_viewed_panel": include_panels
+    }
+
+    try:
+        response = await client.post("/v2/get-documents", payload)
+        response.raise_for_status()
+        docs = documents_of_async(response)
+        if sizer is not None:
+            sizer.observe(len(docs), len(response.content), response.elapsed.total_seconds())
+        return docs
+    except CircuitOpenError:
+        raise
+    except ASYNC_API_ERRORS as e:
+        logger.error(f"API Error (get-documents, offset={offset}): {e}")
+        raise
+
+async def iter_documents_async(client: AsyncGranolaClient, limit: int = DEFAULT_LIMIT, prefetch: int = DEFAULT_PREFETCH,
+                               include_panels: bool = True, stitcher: Optional[PageStitcher] = None,
+                               sizer: Optional[PageSizer] = None, start: int = 0) -> AsyncIterator[Dict[str, Any]]:
+    stitcher = stitcher or PageStitcher()
+    sizer = sizer or PageSizer()
+    next_offset = covered = start
+    previous = None
+    pending = deque()
+
+    def schedule():
+        nonlocal next_offset, covered
+        size = sizer.next_size(limit)
+        if prefetch > 0:
+            task = asyncio.ensure_future(fetch_document_page_async(client, next_offset, size, include_panels, sizer))
+        else:
+            task = None
+        pending.append((next_offset, size, task))
+        covered = next_offset + size
+        next_offset += stitcher.stride(size)
+
+    yielded = 0
+    try:
+        schedule()
+        while pending:
+            offset, size, task = pending.popleft()
+            if task is not None:
+                page = await task
+            else:
+                page = await fetch_document_page_async(client, offset, size, include_panels, sizer)
+            if not page:
+                return
+            if len(page) == size:
+                while len(pending) < max(prefetch, 1) and covered < limit:
+                    schedule()
+
+            docs, drifted = stitcher.stitch(page)
+            if drifted and previous:
+                logger.info(f"Listing shifted before offset {offset}; re-reading the page boundary.")
+                docs = stitcher.recover(await fetch_document_page_async(client, *previous, include_panels)) + docs
+            docs = docs[:limit - yielded]
+            previous = (offset, size)
+
+            logger.info(f"Listed {len(docs)} documents (offset {offset}).")
+            stitcher.position = offset
+            for doc in docs:
+                yield doc
+            yielded += len(docs)
+
+            if yielded >= limit or len(page) < size:
+                return
+    finally:
+        for *_, task in pending:
+            if task is not None:
+                task.cancel()
+
+async def fetch_documents_batch_async(client: AsyncGranolaClient, doc_ids: List[str]) -> List[Dict[str, Any]]:
+    payload = {"document_ids": doc_ids, "include_last_viewed_panel": True}
+
+    try:
+        response = await client.post("/v1/get-documents-batch", payload)
+        response.raise_for_status()
+        return documents_of_async(response)
+    except CircuitOpenError:
+        raise
+    except ASYNC_API_ERRORS as e:
+        logger.error(f"API Error (get-documents-batch, {len(doc_ids)} documents): {e}")
+        raise
+
+async def fetch_transcript_async(client: AsyncGranolaClient, doc_id: str,
+                                 writer: Optional[TranscriptWriter] = None) -> Optional[List[Dict[str, Any]]]:
+    endpoint = "/v1/get-document-transcript"
+    payload = {"document_id": doc_id}
+    loop = asyncio.get_running_loop()
+    cached = await loop.run_in_executor(None, client.cache.get, endpoint, doc_id) if client.cache else None
+
+    try:
+        response = await client.post(endpoint, payload, headers=cached.validators() if cached else None,
+                                     stream=writer is not None)
+        if response.status_code == 304 and cached:
+            client.cache.record(hit=True)
+            return json_loads(cached.body)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        body = None
+        if writer is not None and is_large_body(response.headers):
+            try:
+                chunks = response.aiter_bytes(STREAM_CHUNK_SIZE)
+                body, complete = await read_head_async(chunks)
+                if not complete:
+                    await loop.run_in_executor(None, writer.open)
+                    await loop.run_in_executor(None, writer.feed, body)
+                    async for chunk in chunks:
+                        await loop.run_in_executor(None, writer.feed, chunk)
+            finally:
+                await response.aclose()
+            client.transfer.add(endpoint, response.num_bytes_downloaded, len(body) if complete else writer.bytes_read)
+            if not complete:
+                if client.cache:
+                    client.cache.record(hit=False)
+                return None
+        transcript = response_json_async(response, body)
+        if client.cache:
+            client.cache.record(hit=False)
+            await loop.run_in_executor(None, client.cache.put, endpoint, doc_id, response.headers.get("ETag"),
+                                       response.headers.get("Last-Modified"),
+                                       body if body is not None else response.content)
+        return transcript
+    except CircuitOpenError:
+        raise
+    except ASYNC_API_ERRORS as e:
+        logger.error(f"API Error (transcript {doc_id}): {e}")
+        raise
+
+async def sync_document_async(doc: Dict[str, Any], client: AsyncGranolaClient, output_dir: Path,
+                              slots: asyncio.Semaphore, overwrite: bool = False,
+                              store: Optional[PayloadStore] = None, manifest: Optional[SyncManifest] = None) -> bool:
+    doc_id = doc.get("id")
+    title = doc.get("title", "Untitled")
+
+    if not doc_id:
+        return False
+
+    filepath = document_path(doc, output_dir)
+    if filepath is None:
+        return False
+
+    target, overwrite, previous = check_document(doc, filepath, overwrite, manifest)
+    if target is None:
+        logger.info(f"Skipping existing: {filepath.name}")
+        return True
+    filepath = target
+
+    loop = asyncio.get_running_loop()
+    with TranscriptWriter(doc, filepath, overwrite, store) as writer:
+        async with slots:
+            updating = previous is not None or overwrite
+            logger.info(f"{'Updating changed' if updating else 'Downloading new'}: {title}")
+            try:
+                transcript_data = await fetch_transcript_async(client, doc_id, writer)
+            except ASYNC_API_ERRORS:
+                return False
+        if writer.streamed:
+            return await loop.run_in_executor(None, commit_document, writer, manifest, previous)
+
+    if store is not None:
+        await loop.run_in_executor(None, store.record, doc, transcript_data)
+    full_content = render_document(doc, transcript_data)
+    return await loop.run_in_executor(None, save_document, doc, filepath, full_content, overwrite, manifest, previous)
+
+async def sync_one_async(doc: Dict[str, Any], client: AsyncGranolaClient, output_dir: Path,
+                         slots: asyncio.Semaphore, store: Optional[PayloadStore] = None,
+                         manifest: Optional[SyncManifest] = None) -> bool:
+    try:
+        return await sync_document_async(doc, client, output_dir, slots, store=store, manifest=manifest)
+    except (KeyError, ValueError, TypeError, OSError) as e:
+        logger.error(f"Error processing doc '{doc.get('title')}': {e}")
+        return False
+
+async def sync_all_async(documents: AsyncIterator[Dict[str, Any]], client: AsyncGranolaClient, output_dir: Path,
+                         concurrency: int, store: Optional[PayloadStore] = None,
+                         manifest: Optional[SyncManifest] = None) -> AsyncIterator[Tuple[Dict[str, Any], bool]]:
+    """asyncio counterpart of sync_all: a bounded, in-order window of sync tasks."""
+    slots = asyncio.Semaphore(concurrency)
+    window = deque()
+    error = None
+    try:
+        async for doc in documents:
+            if client.breaker.gave_up:
+                break  # leave the rest of the listing for the next run
+            window.append((doc, asyncio.ensure_future(sync_one_async(doc, client, output_dir, slots, store, manifest))))
+            if len(window) >= concurrency * 2:
+                doc, task = window.popleft()
+                yield doc, await task
+    except ASYNC_API_ERRORS as e:
+        error = e
+    while window:
+        doc, task = window.popleft()
+        yield doc, await task
+    if error is not None:
+        raise error
+
+async def skip_current_async(documents: AsyncIterator[Dict[str, Any]], state: SyncState, stop_after: Optional[int],
+                             report: "SyncReport") -> AsyncIterator[Dict[str, Any]]:
+    streak = 0
+    try:
+        async for doc in documents:
+            state.observe(doc)
+            if not state.is_current(doc):
+                streak = 0
+                yield doc
+                continue
+            report.skipped += 1
+            streak += 1
+            if stop_after and streak >= stop_after:
+                logger.info(f"Reached {streak} already-synced documents in a row; stopping the listing.")
+                state.stopped_early = True
+                return
+    finally:
+        await documents.aclose()
+
+async def newest_first_async(documents: AsyncIterator[Dict[str, Any]], queue: RecencyQueue,
+                             budget: Optional[RunBudget] = None) -> AsyncIterator[Dict[str, Any]]:
+    budget = budget or RunBudget()
+    try:
+        async for doc in documents:
+            queue.push(doc)
+            if budget.exhausted:
+                return
+            if queue.full():
+                yield queue.pop()
+    except ASYNC_API_ERRORS:
+        while queue:
+            yield queue.pop()
+        raise
+    finally:
+        await documents.aclose()
+    while queue and not budget.exhausted:
+        yield queue.pop()
+
+async def run_async(token: Union[str, TokenProvider], output_dir: Path, limit: int, concurrency: int,
+                    report: "SyncReport", state: SyncState, limiter: Optional[RateLimiter] = None,
+                    retry: Optional[RetryPolicy] = None, prefetch: int = DEFAULT_PREFETCH,
+                    stop_after_known: Optional[int] = None, panels: Optional[PanelFetcher] = None,
+                    cache: Optional[HttpCache] = None, store: Optional[PayloadStore] = None,
+                    breaker: Optional[CircuitBreaker] = None, stitcher: Optional[PageStitcher] = None,
+                    sizer: Optional[PageSizer] = None, http2: bool = False,
+                    queue: Optional[RecencyQueue] = None, backlog: Optional[Backlog] = None,
+                    budget: Optional[RunBudget] = None, startup: Optional[StartupTimer] = None) -> bool:
+    """
+    Lists and syncs every document into `report` and `state`; returns False
+    when the listing failed or the circuit breaker gave up. With stop_after_known, runs incrementally; with
+    `panels`, lists without panel content and fetches it per document. With
+    `backlog`, resumes a run stopped at its budget; with `budget`, stops
+    starting documents once it is spent. `startup` is logged with the time
+    of the first request.
+    """
+    budget = budget or RunBudget()
+    async with AsyncGranolaClient(token, concurrency, limiter=limiter, retry=retry, cache=cache,
+                                  breaker=breaker, http2=http2, budget=budget) as client:
+        logger.info("Fetching document list...")
+        listing = (backlog or Backlog()).iter_async(client, state, report, stop_after_known, limit, prefetch,
+                                                    panels is None, stitcher or PageStitcher(), sizer or PageSizer())
+        documents = newest_first_async(listing, queue if queue is not None else RecencyQueue(), budget)
+        if panels is not None:
+            documents = panels.iter_async(client, documents)
+        try:
+            async for doc, ok in sync_all_async(documents, client, output_dir, concurrency, store, state.manifest):
+                report.record(doc, ok)
+                state.record(doc, ok)
+        except ASYNC_API_ERRORS:
+            if not client.breaker.gave_up:
+                logger.critical("Document listing failed; the remaining documents will be synced on the next run.")
+                return False
+        finally:
+            await documents.aclose()
+            if startup is not None:
+                startup.log(client.first_request)
+            client.log_stats()
+    if client.breaker.gave_up:
+        logger.critical("Stopped: the API is failing; the remaining documents will be synced on the next run.")
+        return False
+    return True
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Export Granola meeting notes to local Markdown files."
+    )
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["sync", "rebuild"],
+        default="sync",
+        help="'sync' (default) fetches from the API; 'rebuild' re-renders the vault from the "
+             "local payload store without any network calls.",
+    )
+    parser.add_argument(
+        "-o", "--output-dir",
+        type=Path,
+        default=os.environ.get("GRANOLA_OUTPUT_DIR", str(DEFAULT_OUTPUT_DIR)),
+        help=f"Output directory for Markdown files (default: {DEFAULT_OUTPUT_DIR}). "
+             "Can also be set via GRANOLA_OUTPUT_DIR env var.",
+    )
+    parser.add_argument(
+        "-l", "--limit",
+        type=int,
+        default=int(os.environ.get("GRANOLA_LIMIT", "0")),
+        help="Maximum number of documents to fetch (default: all).",
+    )
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=int(os.environ["GRANOLA_WORKERS"]) if os.environ.get("GRANOLA_WORKERS") else None,
+        help=f"Number of documents to sync in parallel (default: {DEFAULT_WORKERS}, "
+             f"or {DEFAULT_ASYNC_CONCURRENCY} in-flight requests with --engine async).",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["sync", "async"],
+        default=os.environ.get("GRANOLA_ENGINE", "sync"),
+        help="Execution engine: thread-based 'sync' (default) or asyncio-based 'async' (requires httpx).",
+    )
+    parser.add_argument(
+        "--http2",
+        action="store_true",
+        default=os.environ.get("GRANOLA_HTTP2") == "1",
+        help="Multiplex all requests over one HTTP/2 connection (--engine async only; requires httpx[http2]).",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=float(os.environ.get("GRANOLA_RATE", str(DEFAULT_RATE))),
+        help=f"API request budget in requests/second; halved on HTTP 429 (default: {DEFAULT_RATE:g}).",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=int(os.environ.get("GRANOLA_RETRIES", str(DEFAULT_MAX_RETRIES))),
+        help=f"Retries per request after 5xx, timeouts or connection errors (default: {DEFAULT_MAX_RETRIES}).",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=int(os.environ.get("GRANOLA_PREFETCH", str(DEFAULT_PREFETCH))),
+        help=f"Document-list pages to request ahead in the background; 0 disables (default: {DEFAULT_PREFETCH}).",
+    )
+    parser.add_argument(
+        "--min-page-size",
+        type=int,
+        default=int(os.environ.get("GRANOLA_MIN_PAGE_SIZE", str(DEFAULT_MIN_PAGE_SIZE))),
+        help=f"Smallest document-list page the auto-tuning may request (default: {DEFAULT_MIN_PAGE_SIZE}).",
+    )
+    parser.add_argument(
+        "--max-page-size",
+        type=int,
+        default=int(os.environ.get("GRANOLA_MAX_PAGE_SIZE", str(DEFAULT_MAX_PAGE_SIZE))),
+        help="Largest (and first) document-list page; must not exceed what the API serves per page "
+             f"(default: {DEFAULT_MAX_PAGE_SIZE}).",
+    )
+    parser.add_argument(
+        "--page-overlap",
+        type=int,
+        default=int(os.environ.get("GRANOLA_PAGE_OVERLAP", str(DEFAULT_PAGE_OVERLAP))),
+        help="Documents each document-list page re-reads from the previous one, to detect meetings created "
+             f"or deleted mid-listing; 0 only deduplicates (default: {DEFAULT_PAGE_OVERLAP}).",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Page through the whole account instead of stopping at already-synced documents.",
+    )
+    parser.add_argument(
+        "--stop-after-known",
+        type=int,
+        default=int(os.environ.get("GRANOLA_STOP_AFTER_KNOWN", str(DEFAULT_STOP_AFTER_KNOWN))),
+        help="Incremental mode: stop listing after this many already-synced documents in a row "
+             f"(default: {DEFAULT_STOP_AFTER_KNOWN}).",
+    )
+    parser.add_argument(
+        "--max-duration",
+        type=float,
+        default=float(os.environ.get("GRANOLA_MAX_DURATION", 0)),
+        help="Stop starting documents after this many seconds and resume on the next run; 0 means no limit.",
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=int(os.environ.get("GRANOLA_MAX_REQUESTS", 0)),
+        help="Stop starting documents after this many API requests and resume on the next run; "
+             "0 means no limit.",
+    )
+    parser.add_argument(
+        "--priority-window",
+        type=int,
+        default=int(os.environ.get("GRANOLA_PRIORITY_WINDOW", DEFAULT_PRIORITY_WINDOW)),
+        help=f"Listed documents to look ahead so the most recent meetings sync first, at most one page; "
+             f"0 keeps listing order (default: {DEFAULT_PRIORITY_WINDOW}).",
+    )
+    parser.add_argument(
+        "--two-phase",
+        action="store_true",
+        default=os.environ.get("GRANOLA_TWO_PHASE") == "1",
+        help="List documents without panel content, then fetch content only for new or changed documents.",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=os.environ.get("GRANOLA_CACHE_DIR"),
+        help=f"Directory of the transcript HTTP cache (default: OUTPUT_DIR/{CACHE_DIRNAME}).",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=float(os.environ.get("GRANOLA_CACHE_MAX_MB", str(DEFAULT_CACHE_MAX_MB))),
+        help=f"Size cap of the HTTP cache; least recently used entries are evicted (default: {DEFAULT_CACHE_MAX_MB}).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Don't cache transcripts or send conditional requests.",
+    )
+    parser.add_argument(
+        "--cache-info",
+        action="store_true",
+        help="Print HTTP cache statistics and exit.",
+    )
+    parser.add_argument(
+        "--cache-purge",
+        action="store_true",
+        help="Delete every HTTP cache entry and exit.",
+    )
+    parser.add_argument(
+        "--no-store",
+        action="store_true",
+        help=f"Don't keep raw API payloads in OUTPUT_DIR/{STORE_DIRNAME} (disables 'rebuild' for new meetings).",
+    )
+    parser.add_argument(
+        "--breaker-threshold",
+        type=float,
+        default=float(os.environ.get("GRANOLA_BREAKER_THRESHOLD", str(DEFAULT_BREAKER_THRESHOLD))),
+        help="Failed share of recent API requests that stops the run; 0 disables the circuit breaker "
+             f"(default: {DEFAULT_BREAKER_THRESHOLD:g}).",
+    )
+    parser.add_argument(
+        "--max-outage",
+        type=float,
+        default=float(os.environ.get("GRANOLA_MAX_OUTAGE", "0")),
+        help="Seconds to keep probing a failing API for recovery before giving up (default: 0, give up at once).",
+    )
+    args = parser.parse_args()
+    if args.stop_after_known < 1:
+        parser.error("--stop-after-known must be at least 1")
+    if args.rate <= 0:
+        parser.error("--rate must be positive")
+    if args.prefetch < 0:
+        parser.error("--prefetch must not be negative")
+    if not 1 <= args.min_page_size <= args.max_page_size:
+        parser.error("--min-page-size must be at least 1 and at most --max-page-size")
+    if args.max_duration < 0 or args.max_requests < 0:
+        parser.error("--max-duration and --max-requests must not be negative")
+    if args.priority_window < 0:
+        parser.error("--priority-window must not be negative")
+    if args.page_overlap < 0:
+        parser.error("--page-overlap must not be negative")
+    if not 0 <= args.breaker_threshold <= 1:
+        parser.error("--breaker-threshold must be between 0 and 1")
+    if args.max_outage < 0:
+        parser.error("--max-outage must not be negative")
+    if args.http2 and args.engine != "async":
+        parser.error("--http2 requires --engine async")
+    return args
+
+
+def sync_one(doc: Dict[str, Any], client: GranolaClient, output_dir: Path,
+             store: Optional[PayloadStore] = None, manifest: Optional[SyncManifest] = None) -> bool:
+    try:
+        return sync_document(doc, client, output_dir, store=store, manifest=manifest)
+    except (KeyError, ValueError, TypeError, OSError) as e:
+        logger.error(f"Error processing doc '{doc.get('title')}': {e}")
+        return False
+
+def sync_all(documents: Iterable[Dict[str, Any]], client: GranolaClient, output_dir: Path,
+             workers: int = 1, store: Optional[PayloadStore] = None,
+             manifest: Optional[SyncManifest] = None) -> Iterator[Tuple[Dict[str, Any], bool]]:
+    """
+    Syncs documents as they arrive and yields (doc, result) in input order.
+    With workers > 1 the transcript fetches and writes run on a bounded thread
+    pool; at most 2 x workers documents are in flight, so a streaming listing
+    is never drained into memory. Documents the manifest has a file for
+    were synced before and have changed, so their files are rewritten.
+    Once the client's circuit breaker gives up, no further documents are
+    started.
+    """
+    if workers <= 1:
+        for doc in documents:
+            if client.breaker.gave_up:
+                return
+            yield doc, sync_one(doc, client, output_dir, store, manifest)
+        return
+
+    window = deque()
+    error = None
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="granola-sync") as executor:
+        try:
+            for doc in documents:
+                if client.breaker.gave_up:
+                    break  # leave the rest of the listing for the next run
+                window.append((doc, executor.submit(sync_one, doc, client, output_dir, store, manifest)))
+                if len(window) >= workers * 2:
+                    doc, future = window.popleft()
+                    yield doc, future.result()
+        except requests.RequestException as e:
+            # Listing failed mid-way: still report the documents already in flight.
+            error = e
+        while window:
+            doc, future = window.popleft()
+            yield doc, future.result()
+    if error is not None:
+        raise error
+
+class SyncReport:
+    """Running tally of a sync; keeps only the failed documents, not the whole listing."""
+
+    def __init__(self):
+        self.total = 0
+        self.succeeded = 0
+        self.skipped = 0  # already synced, not even considered (incremental mode)
+        self.failed: List[Tuple[str, Optional[str]]] = []
+
+    def record(self, doc: Dict[str, Any], ok: bool):
+        self.total += 1
+        if ok:
+            self.succeeded += 1
+        else:
+            self.failed.append((doc.get('title', 'Untitled'), doc.get('id')))
+
+    def log(self, output_dir: Path, action: str = "Sync"):
+        for title, doc_id in self.failed:
+            logger.warning(f"Failed: {title} ({doc_id})")
+        summary = f"{action} complete. {self.succeeded}/{self.total} notes saved to {output_dir}"
+        if self.skipped:
+            summary += f" ({self.skipped} already synced)"
+        logger.info(summary)
+
+def finish_run(output_dir: Path, listed: bool, exhaustive: bool, report: SyncReport, state: SyncState,
+               backlog: Backlog, queue: RecencyQueue, stitcher: PageStitcher, sizer: PageSizer,
+               budget: RunBudget, limiter: RateLimiter, retry: RetryPolicy, breaker: CircuitBreaker,
+               panels: Optional[PanelFetcher] = None, cache: Optional[HttpCache] = None,
+               store: Optional[PayloadStore] = None):
+    """Saves what a sync run leaves for the next one and logs its statistics; the same for both engines."""
+    backlog.save(state, queue, stitcher, budget, listed, exhaustive)
+    if listed and exhaustive and not report.failed and not state.stopped_early:
+        state.advance()
+    if sizer.chosen:
+        state.page_size = sizer.size
+    state.save()
+    report.log(output_dir)
+    stitcher.log_stats()
+    sizer.log_stats()
+    queue.log_stats()
+    if panels is not None:
+        panels.log_stats()
+    if cache is not None:
+        cache.log_stats()
+    if store is not None:
+        store.save()
+        store.log_stats()
+    state.manifest.log_stats()
+    state.manifest.close()
+    limiter.log_stats()
+    retry.log_stats()
+    breaker.log_stats()
+
+def main():
+    args = parse_args()
+    output_dir = Path(args.output_dir)
+    limit = args.limit if args.limit > 0 else DEFAULT_LIMIT * 100  # effectively unlimited
+    workers = max(args.workers or DEFAULT_WORKERS, 1)
+    pool_size = max(DEFAULT_POOL_SIZE, workers + args.prefetch)
+
+    syncing = args.command == "sync" and not (args.cache_info or args.cache_purge)
+    if syncing:
+        # Before anything is created or connected; only rebuild and the cache commands work anywhere.
+        check_platform()
+
+    # Connect to the API while the local setup below runs.
+    startup = StartupTimer()
+    if syncing:
+        adapter = GranolaClient.make_adapter(pool_size) if args.engine == "sync" else None
+        startup.preconnect = Preconnector(adapter=adapter).start()
+
+    if not output_dir.exists():
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            logger.info(f"Created output directory: {output_dir}")
+        except OSError as e:
+            logger.critical(f"Could not create output directory: {e}")
+            return 1
+    startup.mark("output directory")
+
+    store = None
+    if not args.no_store or args.command == "rebuild":
+        try:
+            store = PayloadStore(output_dir / STORE_DIRNAME)
+        except OSError as e:
+            logger.warning(f"Payload store disabled: {e}")
+    startup.mark("payload store")
+
+    if args.command == "rebuild":
+        if store is None:
+            return 1
+        logger.info(f"Rebuilding {len(store.index)} documents from {store.directory} (no network)...")
+        manifest = SyncManifest(output_dir / MANIFEST_FILENAME, output_dir)
+        report = rebuild_vault(store, output_dir, manifest)
+        manifest.close()
+        report.log(output_dir, action="Rebuild")
+        return 1 if report.failed else 0
+
+    cache = None
+    if not args.no_cache:
+        cache_dir = args.cache_dir or output_dir / CACHE_DIRNAME
+        try:
+            cache = HttpCache(Path(cache_dir), max_bytes=int(args.cache_max_mb * 1024 * 1024))
+        except OSError as e:
+            logger.warning(f"HTTP cache disabled: {e}")
+    startup.mark("HTTP cache")
+
+    if args.cache_info or args.cache_purge:
+        if cache is None:
+            logger.error("The HTTP cache is disabled.")
+            return 1
+        if args.cache_purge:
+            logger.info(f"Removed {cache.purge()} cache entries from {cache.directory}")
+        info = cache.info()
+        logger.info(
+            f"Cache {info['directory']}: {info['entries']} entries, {format_bytes(info['bytes'])} "
+            f"of {format_bytes(info['max_bytes'])}; least recently used {info['oldest_use']}, "
+            f"most recently used {info['newest_use']}"
+        )
+        return 0
+
+    token = TokenProvider.from_file()
+    if not token:
+        return 1
+    startup.mark("credentials")
+
+    budget = RunBudget(args.max_duration, args.max_requests)
+    limiter = RateLimiter(args.rate)
+    retry = RetryPolicy(max_retries=args.retries)
+    breaker = CircuitBreaker(args.breaker_threshold, max_outage=args.max_outage)
+    report = SyncReport()
+    state = SyncState.load(output_dir)
+    stop_after_known = None if args.full else args.stop_after_known
+    if state.interrupted and stop_after_known:
+        logger.info("The previous run was interrupted; listing every document to pick up where it stopped.")
+        stop_after_known = None
+    exhaustive = args.limit <= 0
+    panels = PanelFetcher(report, state) if args.two_phase else None
+    stitcher = PageStitcher(args.page_overlap)
+    sizer = PageSizer(args.min_page_size, args.max_page_size,
+                      initial=state.page_size if isinstance(state.page_size, int) else None)
+    queue = RecencyQueue(args.priority_window, sizer)
+    backlog = Backlog(state.backlog_ids(), state.resume_offset) if exhaustive else Backlog()
+    startup.mark("sync state")
+
+    if args.engine == "async":
+        if httpx is None:
+            logger.critical("The async engine requires httpx: pip install httpx")
+            return 1
+        if args.http2 and importlib.util.find_spec("h2") is None:
+            logger.critical("HTTP/2 requires the h2 package: pip install 'httpx[http2]'")
+            return 1
+        concurrency = max(args.workers or DEFAULT_ASYNC_CONCURRENCY, 1)
+        listed = asyncio.run(run_async(token, output_dir, limit, concurrency, report, state, limiter, retry,
+                                       prefetch=args.prefetch, stop_after_known=stop_after_known, panels=panels, cache=cache,
+                                       store=store, breaker=breaker, stitcher=stitcher, sizer=sizer,
+                                       http2=args.http2, queue=queue, backlog=backlog, budget=budget,
+                                       startup=startup))
+        finish_run(output_dir, listed, exhaustive, report, state, backlog, queue, stitcher, sizer, budget,
+                   limiter, retry, breaker, panels=panels, cache=cache, store=store)
+        return 0 if listed else 1
+
+    with GranolaClient(token, pool_size=pool_size, limiter=limiter, retry=retry, cache=cache,
+                       breaker=breaker, budget=budget, adapter=startup.preconnect.join()) as client:
+        logger.info("Fetching document list...")
+        listing = backlog.iter(client, state, report, stop_after_known, limit, args.prefetch, panels is None,
+                               stitcher, sizer)
+        documents = newest_first(listing, queue, budget)
+        if panels is not None:
+            documents = panels.iter(client, documents)
+        listed = True
+        try:
+            for doc, ok in sync_all(documents, client, output_dir, workers=workers, store=store,
+                                    manifest=state.manifest):
+                report.record(doc, ok)
+                state.record(doc, ok)
+        except requests.RequestException:
+            if not breaker.gave_up:
+                logger.critical("Document listing failed; the remaining documents will be synced on the next run.")
+            listed = False
+        finally:
+            documents.close()
+        if breaker.gave_up:
+            logger.critical("Stopped: the API is failing; the remaining documents will be synced on the next run.")
+            listed = False
 
-    logger.info(f"Sync complete. {success_count}/{len(documents)} notes saved to {output_dir}")
+        startup.log(client.first_request)
+        client.log_stats()
+    finish_run(output_dir, listed, exhaustive, report, state, backlog, queue, stitcher, sizer, budget,
+               limiter, retry, breaker, panels=panels, cache=cache, store=store)
+    return 0 if listed else 1
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,556 @@
+"""
+Local stand-in for the Granola API, for benchmarking and load-testing
+granola_sync.py without touching api.granola.ai.
+
+Serves a deterministic synthetic corpus on the endpoints the sync uses:
+  POST /v2/get-documents           offset pagination, include_last_viewed_panel
+  POST /v1/get-documents-batch     full documents for a list of IDs
+  POST /v1/get-document-transcript transcripts (404 for meetings without one)
+
+Latency, connection setup cost, server errors, dropped connections, 429
+throttling, a full outage partway through, meetings created/deleted
+mid-listing and short-lived access tokens are configurable. When the h2
+package is installed, the same port also speaks cleartext HTTP/2 to
+clients that open with the HTTP/2 preface (prior knowledge). Point the sync at it with:
+
+  python mock_granola_server.py --port 8080 --write-creds /tmp/granola-creds.json
+  GRANOLA_API_BASE_URL=http://127.0.0.1:8080 GRANOLA_CREDS_FILE=/tmp/granola-creds.json \
+      python granola_sync.py -o /tmp/vault
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from email.message import Message
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, Dict, List, Any, Tuple
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+except ImportError:
+    h2 = None
+
+# --- Logging Setup ---
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("mock_granola_server")
+
+NAMES = ["Ada Lovelace", "Grace Hopper", "Alan Turing", "Katherine Johnson", "Edsger Dijkstra",
+         "Barbara Liskov", "Donald Knuth", "Frances Allen", "Ken Thompson", "Radia Perlman"]
+TOPICS = ["Weekly Standup", "Design Review", "Client Call", "1:1", "Planning / Roadmap",
+          "Retro", "Hiring Sync", "Incident Review", "Budget <> Finance", "All-hands"]
+WORDS = ("the we should ship next week after review budget design customer api latency "
+         "sync notes action item follow up blocker team plan metrics launch").split()
+
+# --- Corpus ---
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+def build_corpus(size: int, seed: int, panel_paragraphs: int, transcript_segments: int,
+                 missing_transcript_rate: float) -> Dict[str, Any]:
+    """Builds `size` documents, newest first, and the transcripts that exist for them."""
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    docs = []
+    transcripts = {}
+    for i in range(size):
+        created = start - timedelta(hours=7 * i + rng.randint(0, 5))
+        doc_id = f"{rng.getrandbits(32):08x}-{i:04x}-4000-8000-{rng.getrandbits(48):012x}"
+        attendees = rng.sample(NAMES[1:], rng.randint(0, 3))
+        paragraphs = [{"type": "heading", "attrs": {"level": 2},
+                       "content": [{"type": "text", "text": "Notes"}]}]
+        for _ in range(rng.randint(1, max(panel_paragraphs, 1))):
+            paragraphs.append({"type": "paragraph",
+                               "content": [{"type": "text", "text": sentence(rng, rng.randint(8, 40))}]})
+        paragraphs.append({"type": "bulletList", "content": [
+            {"type": "listItem", "content": [{"type": "paragraph", "content": [
+                {"type": "text", "text": sentence(rng, 6), "marks": [{"type": "bold"}]}]}]}
+        ]})
+        docs.append({
+            "id": doc_id,
+            "title": f"{rng.choice(TOPICS)} #{size - i}",
+            "created_at": created.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            "updated_at": (created + timedelta(minutes=rng.randint(30, 600))).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+            "people": {
+                "creator": {"name": NAMES[0], "email": "ada@example.com"},
+                "attendees": [
+                    {"email": f"{name.split()[0].lower()}@example.com",
+                     "details": {"person": {"name": {"fullName": name}}}}
+                    for name in attendees
+                ],
+            },
+            "last_viewed_panel": {"content": {"type": "doc", "content": paragraphs}},
+        })
+        if rng.random() >= missing_transcript_rate:
+            transcripts[doc_id] = [
+                {"source": rng.choice(["microphone", "system"]), "text": sentence(rng, rng.randint(4, 30))}
+                for _ in range(rng.randint(1, max(transcript_segments, 1)))
+            ]
+    return {"docs": docs, "by_id": {doc["id"]: doc for doc in docs}, "transcripts": transcripts}
+
+def without_panel(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in doc.items() if key != "last_viewed_panel"}
+
+# --- Fault Injection ---
+
+class ServerThrottle:
+    """Server-side token bucket; requests over the budget get 429 + Retry-After."""
+
+    def __init__(self, rps: float):
+        self.rps = rps
+        self.tokens = rps
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def admit(self) -> Optional[float]:
+        """Returns None when admitted, else the seconds until a token is available."""
+        if self.rps <= 0:
+            return None
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rps, self.tokens + (now - self.updated) * self.rps)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return None
+            return (1 - self.tokens) / self.rps
+
+def sample_latency(rng: random.Random, dist: str, mean_ms: float) -> float:
+    if mean_ms <= 0:
+        return 0.0
+    if dist == "uniform":
+        return rng.uniform(0, 2 * mean_ms) / 1000
+    if dist == "exponential":
+        return rng.expovariate(1 / mean_ms) / 1000
+    return mean_ms / 1000
+
+# --- HTTP ---
+
+class ApiExchange:
+    """
+    One API request and its response, independent of the HTTP version that
+    carries it. Subclasses provide `path`, case-insensitive `headers`,
+    `server`, respond() and drop().
+    """
+    path: str
+    headers: Message
+    server: "MockGranolaServer"
+
+    def respond(self, status: int, headers: Dict[str, str], data: bytes):
+        raise NotImplementedError
+
+    def drop(self):
+        """Abandons the request without a response."""
+        raise NotImplementedError
+
+    def send_json(self, status: int, payload: Any, etag: Optional[str] = None):
+        data = json.dumps(payload).encode('utf-8')
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_empty(304, {"ETag": etag})
+            return
+        headers = {"Content-Type": "application/json"}
+        if etag:
+            headers["ETag"] = etag
+        if "gzip" in self.headers.get("Accept-Encoding", "") and len(data) > 512:
+            data = gzip.compress(data, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        self.respond(status, headers, data)
+
+    def send_empty(self, status: int, headers: Optional[Dict[str, str]] = None):
+        self.respond(status, headers or {}, b"")
+
+    def serve(self, raw_body: bytes):
+        try:
+            body = json.loads(raw_body or b"{}")
+        except ValueError:
+            body = {}
+        self.server.count(self.path, self.handle_api(body))
+
+    def handle_api(self, body: Dict[str, Any]) -> int:
+        server = self.server
+        opts = server.options
+
+        authorization = self.headers.get("Authorization") or ""
+        if opts.token and authorization != f"Bearer {opts.token}":
+            self.send_empty(401)
+            return 401
+        if opts.token_ttl and token_expired(authorization[len("Bearer "):]):
+            self.send_empty(401)
+            return 401
+
+        if server.in_outage():
+            self.send_empty(503)
+            return 503
+
+        wait = server.throttle.admit()
+        if wait is not None:
+            self.send_empty(429, {"Retry-After": str(max(1, round(wait)))})
+            return 429
+
+        with server.rng_lock:
+            latency = sample_latency(server.rng, opts.latency_dist, opts.latency_ms)
+            roll = server.rng.random()
+        time.sleep(latency)
+
+        if roll < opts.drop_rate:
+            self.drop()
+            return 0
+        if roll < opts.drop_rate + opts.error_rate:
+            self.send_empty(503)
+            return 503
+
+        corpus = server.corpus
+        if self.path == "/v2/get-documents":
+            offset = max(int(body.get("offset", 0)), 0)
+            limit = min(max(int(body.get("limit", 100)), 0), 100)
+            with server.corpus_lock:
+                docs = corpus["docs"][offset:offset + limit]
+                server.churn()
+            if not body.get("include_last_viewed_panel", True):
+                docs = [without_panel(doc) for doc in docs]
+            time.sleep(len(docs) * opts.latency_per_doc_ms / 1000)
+            self.send_json(200, {"docs": docs})
+            return 200
+
+        if self.path == "/v1/get-documents-batch":
+            ids = body.get("document_ids") or []
+            docs = [corpus["by_id"][doc_id] for doc_id in ids if doc_id in corpus["by_id"]]
+            if not body.get("include_last_viewed_panel", True):
+                docs = [without_panel(doc) for doc in docs]
+            self.send_json(200, {"docs": docs})
+            return 200
+
+        if self.path == "/v1/get-document-transcript":
+            transcript = corpus["transcripts"].get(body.get("document_id"))
+            if transcript is None:
+                self.send_empty(404)
+                return 404
+            etag = '"' + hashlib.sha256(json.dumps(transcript).encode('utf-8')).hexdigest()[:32] + '"'
+            self.send_json(200, transcript, etag=etag)
+            return 200
+
+        self.send_empty(404)
+        return 404
+
+class MockGranolaHandler(ApiExchange, BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out as separate writes; don't let Nagle + delayed ACK stall them.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # Stand-in for the TCP + TLS handshakes to a remote host, which loopback doesn't have.
+        time.sleep(self.server.options.connect_ms / 1000)
+
+    def handle(self):
+        if h2 is not None and self.rfile.peek(len(H2_PREFACE)).startswith(H2_PREFACE[:4]):
+            self.server.count_connection("HTTP/2")
+            H2Session(self).run()
+        else:
+            self.server.count_connection("HTTP/1.1")
+            super().handle()
+
+    def log_message(self, format: str, *args):
+        pass
+
+    def respond(self, status: int, headers: Dict[str, str], data: bytes):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def drop(self):
+        self.close_connection = True
+        self.connection.shutdown(socket.SHUT_RDWR)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.serve(self.rfile.read(length))
+
+H2_PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+class H2Exchange(ApiExchange):
+    """A request on an HTTP/2 stream; the response is collected, then sent by H2Session."""
+
+    def __init__(self, server: "MockGranolaServer", headers: List[Tuple[str, str]]):
+        self.server = server
+        self.headers = Message()
+        for name, value in headers:
+            if name == ":path":
+                self.path = value
+            elif not name.startswith(":"):
+                self.headers[name] = value
+        self.response: Optional[Tuple[int, Dict[str, str], bytes]] = None
+
+    def respond(self, status: int, headers: Dict[str, str], data: bytes):
+        self.response = (status, headers, data)
+
+    def drop(self):
+        self.response = None
+
+class H2Session:
+    """
+    Cleartext HTTP/2 on one connection: the connection thread reads frames,
+    and every request stream is answered from a thread of its own, so slow
+    responses don't hold up the others. All h2 state is guarded by `lock`,
+    which response threads also wait on for flow-control window.
+    """
+
+    def __init__(self, handler: MockGranolaHandler):
+        self.handler = handler
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False,
+                                                                       header_encoding='utf-8'))
+        self.lock = threading.Condition()
+        self.requests: Dict[int, Tuple[List[Tuple[str, str]], bytearray]] = {}
+        self.closed = False
+
+    def flush(self):
+        data = self.conn.data_to_send()
+        if data:
+            self.handler.wfile.write(data)
+
+    def run(self):
+        with self.lock:
+            self.conn.initiate_connection()
+            self.flush()
+        try:
+            while not self.closed:
+                data = self.handler.rfile.read1(65536)
+                if not data:
+                    break
+                with self.lock:
+                    self.receive(data)
+                    self.flush()
+        except (OSError, h2.exceptions.ProtocolError):
+            pass
+        finally:
+            with self.lock:
+                self.closed = True
+                self.lock.notify_all()
+
+    def receive(self, data: bytes):
+        for event in self.conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                self.requests[event.stream_id] = (event.headers, bytearray())
+            elif isinstance(event, h2.events.DataReceived):
+                self.requests[event.stream_id][1].extend(event.data)
+                self.conn.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, h2.events.StreamEnded):
+                headers, body = self.requests.pop(event.stream_id)
+                threading.Thread(target=self.answer, args=(event.stream_id, headers, bytes(body)),
+                                 daemon=True).start()
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self.closed = True
+        self.lock.notify_all()  # window updates and settings may unblock senders
+
+    def answer(self, stream_id: int, headers: List[Tuple[str, str]], body: bytes):
+        exchange = H2Exchange(self.handler.server, headers)
+        exchange.serve(body)
+        try:
+            with self.lock:
+                if exchange.response is None:
+                    self.conn.reset_stream(stream_id)
+                    self.flush()
+                    return
+                status, response_headers, data = exchange.response
+                self.conn.send_headers(stream_id, [(":status", str(status)), ("content-length", str(len(data)))] +
+                                       [(name.lower(), value) for name, value in response_headers.items()],
+                                       end_stream=not data)
+                self.flush()
+                while data:
+                    window = min(self.conn.local_flow_control_window(stream_id), self.conn.max_outbound_frame_size)
+                    if window <= 0:
+                        if self.closed:
+                            return
+                        self.lock.wait()
+                        continue
+                    chunk, data = data[:window], data[window:]
+                    self.conn.send_data(stream_id, chunk, end_stream=not data)
+                    self.flush()
+        except (OSError, h2.exceptions.StreamClosedError):
+            pass  # the client went away or reset the stream
+
+class MockGranolaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # listen backlog; the default 5 resets bursts of new connections
+
+    def __init__(self, address, options: argparse.Namespace):
+        super().__init__(address, MockGranolaHandler)
+        self.options = options
+        self.corpus = build_corpus(options.documents, options.seed, options.panel_paragraphs,
+                                   options.transcript_segments, options.missing_transcript_rate)
+        self.throttle = ServerThrottle(options.rps)
+        self.rng = random.Random(options.seed + 1)
+        self.rng_lock = threading.Lock()
+        self.corpus_lock = threading.Lock()
+        self.listings = 0
+        self.requests = Counter()
+        self.connections = Counter()
+        self.outage_started: Optional[float] = None
+        self._count_lock = threading.Lock()
+
+    def churn(self):
+        """Every --churn-every listing requests, adds meetings at the top and deletes random ones (holds corpus_lock)."""
+        self.listings += 1
+        every = self.options.churn_every
+        if every <= 0 or self.listings % every:
+            return
+        docs = self.corpus["docs"]
+        for _ in range(self.options.churn_deletes):
+            if docs:
+                with self.rng_lock:
+                    victim = docs.pop(self.rng.randrange(len(docs) // 2 + 1) if len(docs) > 1 else 0)
+                del self.corpus["by_id"][victim["id"]]
+        for _ in range(self.options.churn_inserts):
+            with self.rng_lock:
+                doc = dict(docs[0]) if docs else {}
+                doc["id"] = f"{self.rng.getrandbits(32):08x}-ffff-4000-8000-{self.rng.getrandbits(48):012x}"
+            doc["title"] = f"Ad-hoc Meeting {self.listings}"
+            doc["created_at"] = doc["updated_at"] = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+            docs.insert(0, doc)
+            self.corpus["by_id"][doc["id"]] = doc
+
+    def in_outage(self) -> bool:
+        """Simulated outage: every request after the first --outage-after fails for --outage-seconds."""
+        if self.options.outage_after <= 0:
+            return False
+        with self._count_lock:
+            if self.outage_started is None:
+                if sum(self.requests.values()) < self.options.outage_after:
+                    return False
+                self.outage_started = time.monotonic()
+                logger.info(f"Outage started after {self.options.outage_after} requests")
+            seconds = self.options.outage_seconds
+            return seconds <= 0 or time.monotonic() - self.outage_started < seconds
+
+    def count(self, path: str, status: int):
+        with self._count_lock:
+            self.requests[(path, status)] += 1
+
+    def count_connection(self, protocol: str):
+        with self._count_lock:
+            self.connections[protocol] += 1
+
+    def log_stats(self):
+        for (path, status), n in sorted(self.requests.items()):
+            logger.info(f"{path} {status or 'dropped'}: {n}")
+        for protocol, n in sorted(self.connections.items()):
+            logger.info(f"{protocol} connections: {n}")
+
+def make_token(ttl: float) -> str:
+    """An unsigned JWT-shaped token whose exp claim is `ttl` seconds from now."""
+    def segment(claims: Dict[str, Any]) -> str:
+        return base64.urlsafe_b64encode(json.dumps(claims).encode('utf-8')).rstrip(b"=").decode('ascii')
+    return f"{segment({'alg': 'none', 'typ': 'JWT'})}.{segment({'sub': 'mock', 'exp': int(time.time() + ttl)})}.mock"
+
+def token_expired(token: str) -> bool:
+    try:
+        claims = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(claims + "=" * (-len(claims) % 4)))["exp"] <= time.time()
+    except (IndexError, ValueError, KeyError, TypeError):
+        return True
+
+def write_creds(path: Path, token: str, expires_in: float = 3600):
+    """Writes a supabase.json-shaped credentials file the sync can load."""
+    workos_tokens = {"access_token": token, "expires_in": int(expires_in),
+                     "obtained_at": int(time.time() * 1000), "token_type": "Bearer"}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, 'w') as f:
+        json.dump({"workos_tokens": json.dumps(workos_tokens)}, f)
+    os.replace(tmp, path)  # readers never see a half-written file
+
+def rotate_creds(path: Path, ttl: float, every: float):
+    """Rewrites the credentials file with a fresh token, as the Granola app does when it refreshes."""
+    while True:
+        time.sleep(every)
+        write_creds(path, make_token(ttl), ttl)
+        logger.info(f"Rotated the access token in {path}")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Local mock of the Granola API for benchmarks and tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--documents", type=int, default=1000, help="Corpus size (default: 1000).")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the corpus and fault injection.")
+    parser.add_argument("--panel-paragraphs", type=int, default=12,
+                        help="Maximum paragraphs per document panel (default: 12).")
+    parser.add_argument("--transcript-segments", type=int, default=300,
+                        help="Maximum segments per transcript (default: 300).")
+    parser.add_argument("--missing-transcript-rate", type=float, default=0.1,
+                        help="Fraction of documents whose transcript returns 404 (default: 0.1).")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Mean added latency (default: 50).")
+    parser.add_argument("--latency-dist", choices=["fixed", "uniform", "exponential"], default="exponential",
+                        help="Latency distribution around the mean (default: exponential).")
+    parser.add_argument("--latency-per-doc-ms", type=float, default=0,
+                        help="Extra get-documents latency per listed document (default: 0).")
+    parser.add_argument("--connect-ms", type=float, default=0,
+                        help="Delay before serving a new connection, standing in for TCP + TLS setup (default: 0).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered 503.")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="Fraction of requests whose connection is dropped without a response.")
+    parser.add_argument("--outage-after", type=int, default=0,
+                        help="Answer 503 to everything once this many requests were served (default: never).")
+    parser.add_argument("--outage-seconds", type=float, default=0,
+                        help="Length of the --outage-after outage; 0 means it never ends.")
+    parser.add_argument("--churn-every", type=int, default=0,
+                        help="Mutate the listing every N get-documents requests, to test pagination drift.")
+    parser.add_argument("--churn-inserts", type=int, default=1, help="Meetings created per churn (default: 1).")
+    parser.add_argument("--churn-deletes", type=int, default=1, help="Meetings deleted per churn (default: 1).")
+    parser.add_argument("--rps", type=float, default=0,
+                        help="Server-side request budget; excess gets 429 + Retry-After (default: unlimited).")
+    parser.add_argument("--token", help="Only accept this bearer token (default: accept any).")
+    parser.add_argument("--write-creds", type=Path,
+                        help="Write a credentials file for GRANOLA_CREDS_FILE, holding --token (or a dummy).")
+    parser.add_argument("--token-ttl", type=float, default=0,
+                        help="Issue JWT-shaped tokens valid this many seconds and answer 401 to expired ones; "
+                             "with --write-creds, the file is rewritten with a fresh token periodically.")
+    parser.add_argument("--token-refresh-seconds", type=float, default=0,
+                        help="How often --token-ttl rewrites the credentials file (default: half the TTL).")
+    options = parser.parse_args(argv)
+    if options.token and options.token_ttl:
+        parser.error("--token and --token-ttl are mutually exclusive")
+    return options
+
+def main(argv: Optional[List[str]] = None):
+    options = parse_args(argv)
+    if options.write_creds:
+        if options.token_ttl:
+            write_creds(options.write_creds, make_token(options.token_ttl), options.token_ttl)
+            threading.Thread(target=rotate_creds, daemon=True,
+                             args=(options.write_creds, options.token_ttl,
+                                   options.token_refresh_seconds or options.token_ttl / 2)).start()
+        else:
+            write_creds(options.write_creds, options.token or "mock-token")
+        logger.info(f"Wrote credentials to {options.write_creds}")
+
+    server = MockGranolaServer((options.host, options.port), options)
+    logger.info(
+        f"Serving {options.documents} documents "
+        f"({len(server.corpus['transcripts'])} with transcripts) on http://{options.host}:{server.server_port}"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.log_stats()
+
+if __name__ == "__main__":
+    main()